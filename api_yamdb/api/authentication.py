@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+from rest_framework import permissions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from reviews.constants import ADMIN, MODERATOR
+from reviews.models import User
+
+# Утверждения токена, по которым права проверяются без запроса к БД:
+ROLE_CLAIM = 'role'
+STAFF_CLAIM = 'is_staff'
+USERNAME_CLAIM = 'username'
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh-токен, который переносит роль пользователя в access-токен."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[USERNAME_CLAIM] = user.username
+        token[ROLE_CLAIM] = user.role
+        token[STAFF_CLAIM] = user.is_staff
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь, восстановленный из утверждений access-токена.
+
+    Хватает для проверки прав: id, роль и признак сотрудника берутся
+    из токена. Роль в токене обновится только с выдачей нового токена.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN or self.is_staff
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR
+
+
+class VerifiedTokenCache:
+    """
+    Ограниченный LRU-кэш уже проверенных access-токенов.
+
+    Повторный запрос с тем же токеном не проверяет подпись заново.
+    Срок действия сверяется при каждом обращении, поэтому кэш не
+    продлевает жизнь токена.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.tokens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self.lock:
+            token = self.tokens.get(raw_token)
+            if token is None:
+                return None
+            if token['exp'] <= time.time():
+                del self.tokens[raw_token]
+                return None
+            self.tokens.move_to_end(raw_token)
+            return token
+
+    def add(self, raw_token, token):
+        with self.lock:
+            self.tokens[raw_token] = token
+            self.tokens.move_to_end(raw_token)
+            while len(self.tokens) > self.size:
+                self.tokens.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.tokens.clear()
+
+
+verified_tokens = VerifiedTokenCache(settings.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без загрузки пользователя для чтения.
+
+    На безопасные запросы с токеном, содержащим роль, возвращается
+    ClaimsUser. Изменяющие запросы и токены без роли работают
+    с пользователем из БД, как JWTAuthentication.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = verified_tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.add(raw_token, token)
+        return token
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if (
+            self.request.method in permissions.SAFE_METHODS
+            and ROLE_CLAIM in validated_token
+        ):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
+
+
+def get_user_instance(user):
+    """Пользователь из БД для ClaimsUser, иначе сам пользователь."""
+    if isinstance(user, ClaimsUser):
+        return get_object_or_404(User, pk=user.pk)
+    return user
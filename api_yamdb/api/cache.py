@@ -0,0 +1,114 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from reviews.models import TableVersion
+
+# Ключ глобальной версии каталога:
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_version(key, request=None):
+    """
+    Возвращает версию ресурса — время его последнего изменения в нс.
+
+    Версии хранятся в таблице версий в БД, поэтому изменение,
+    сделанное любым процессом, сразу видят все остальные. Ресурс,
+    который ещё не менялся, имеет версию 0. С request версия
+    читается из БД один раз за запрос, и ETag и ключ кэша строятся
+    из одного значения.
+    """
+    if request is None:
+        return TableVersion.objects.get_version(key)
+    versions = getattr(request, 'resource_versions', None)
+    if versions is None:
+        versions = request.resource_versions = {}
+    if key not in versions:
+        versions[key] = TableVersion.objects.get_version(key)
+    return versions[key]
+
+
+def bump_version(*keys):
+    """Делает недействительными ответы, построенные на версиях ресурсов."""
+    TableVersion.objects.bump(*keys)
+
+
+class PendingBumps:
+    """Версии, которые увеличатся после фиксации транзакции."""
+
+    def __init__(self):
+        self.keys = set()
+
+    def __call__(self):
+        bump_version(*self.keys)
+
+
+def bump_version_on_commit(key):
+    """
+    Увеличивает версию ресурса после фиксации текущей транзакции.
+
+    Версии, затронутые одной транзакцией, например при каскадном
+    удалении отзывов, обновляются вместе одним набором запросов.
+    Вне транзакции версия увеличивается сразу.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        bump_version(key)
+        return
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, PendingBumps):
+            callback.keys.add(key)
+            return
+    pending = PendingBumps()
+    pending.keys.add(key)
+    transaction.on_commit(pending)
+
+
+def get_catalog_version(request=None):
+    """Возвращает текущую версию каталога."""
+    return get_version(CATALOG_VERSION_KEY, request)
+
+
+def bump_catalog_version():
+    """Делает недействительными закэшированные ответы каталога."""
+    bump_version_on_commit(CATALOG_VERSION_KEY)
+
+
+def get_reviews_version_key(title_id):
+    """Ключ версии отзывов произведения."""
+    return f'reviews:{title_id}'
+
+
+def get_comments_version_key(review_id):
+    """Ключ версии комментариев к отзыву."""
+    return f'comments:{review_id}'
+
+
+def get_list_cache_key(prefix, request):
+    """
+    Строит ключ кэша из версии каталога и параметров запроса.
+
+    Версия каталога берётся из БД, поэтому после изменения в любом
+    процессе ключ меняется во всех процессах и устаревший список
+    не отдаётся. Версия та же, что у ETag этого запроса.
+    """
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in sorted(values)
+    ))
+    digest = md5(f'{request.get_host()}?{params}'.encode()).hexdigest()
+    return f'{prefix}:{get_catalog_version(request)}:{digest}'
+
+
+def get_cached_list(prefix, request, get_data):
+    """Возвращает данные списка из кэша или вычисляет и сохраняет их."""
+    key = get_list_cache_key(prefix, request)
+    data = cache.get(key)
+    if data is None:
+        data = get_data()
+        cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+    return data
@@ -1,14 +1,85 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+
+from reviews.constants import EMAIL_BATCH_SIZE
+from reviews.models import OutgoingEmail
 
 
 def send_code_to_email(user):
+    """Ставит письмо с кодом подтверждения в очередь на отправку."""
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    OutgoingEmail.objects.enqueue(
         'Код подтвержения для завершения регистрации',
         f'Ваш код для получения JWT токена {confirmation_code}',
+        user.email,
         settings.DEFAULT_FROM_EMAIL,
-        (user.email,),
-        fail_silently=False,
     )
+
+
+def reopen(connection):
+    """Открывает соединение заново, не прерывая обработку очереди."""
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        # Следующая отправка попробует открыть соединение сама.
+        pass
+
+
+def send_outbox_batch(connection, emails):
+    """
+    Отправляет пачку писем через открытое соединение.
+
+    Результат каждой попытки сохраняется одним запросом на пачку.
+    После ошибки соединение переоткрывается: почтовый сервер мог
+    его разорвать.
+    """
+    sent = 0
+    for email in emails:
+        message = EmailMessage(
+            email.subject,
+            email.body,
+            email.from_email,
+            (email.recipient,),
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            email.mark_failed(error)
+            reopen(connection)
+        else:
+            email.mark_sent()
+            sent += 1
+    OutgoingEmail.objects.bulk_update(
+        emails,
+        ('status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at')
+    )
+    return sent
+
+
+def send_outbox(batch_size=EMAIL_BATCH_SIZE, connection=None):
+    """
+    Отправляет письма, которым подошёл срок, пока очередь не опустеет.
+
+    Все пачки идут через одно соединение с почтовым сервером.
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    connection = connection or get_connection(fail_silently=False)
+    sent = failed = 0
+    opened = False
+    try:
+        while True:
+            emails = OutgoingEmail.objects.claim(batch_size)
+            if not emails:
+                break
+            if not opened:
+                reopen(connection)
+                opened = True
+            batch_sent = send_outbox_batch(connection, emails)
+            sent += batch_sent
+            failed += len(emails) - batch_sent
+    finally:
+        connection.close()
+    return sent, failed
@@ -1,20 +1,124 @@
-from django_filters import FilterSet, CharFilter
+from django.db.models import Count
+from django_filters import CharFilter, ChoiceFilter, FilterSet
 
-from reviews.models import Title
+from reviews.constants import RANKING_CATEGORY, RANKING_GENRE
+from reviews.models import Category, Genre, Title, TitleRanking
+
+
+# Режимы фильтрации по нескольким слагам:
+MATCH_ANY = 'or'
+MATCH_ALL = 'and'
+
+MATCH_CHOICES = (
+    (MATCH_ANY, 'Любой из слагов'),
+    (MATCH_ALL, 'Все слаги'),
+)
 
 
 class TitleFilter(FilterSet):
     """
     Фильтр для произведений.
 
-    Фильтрует произведения по уникальному значению категории,
-    Уникальному значению жанра, названию и году выхода.
+    Фильтрует произведения по категории, жанру, названию и году выхода.
+    Категории и жанры принимают несколько слагов через запятую
+    или повтором параметра; genre_mode и category_mode задают режим:
+    or — любой из слагов, and — все слаги сразу.
+    Параметр search выполняет полнотекстовый поиск по названию
+    и описанию с сортировкой по релевантности.
     """
 
-    category = CharFilter(field_name='category__slug')
-    genre = CharFilter(field_name='genre__slug')
+    category = CharFilter(method='filter_category')
+    category_mode = ChoiceFilter(choices=MATCH_CHOICES, method='filter_mode')
+    genre = CharFilter(method='filter_genre')
+    genre_mode = ChoiceFilter(choices=MATCH_CHOICES, method='filter_mode')
     name = CharFilter(field_name='name')
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('genre', 'category', 'year', 'name')
+        fields = ('genre', 'category', 'year', 'name', 'search')
+
+    def get_slugs(self, name, value):
+        values = (
+            self.data.getlist(name) if hasattr(self.data, 'getlist')
+            else [value]
+        )
+        return {slug for raw in values for slug in raw.split(',') if slug}
+
+    def get_mode(self, name):
+        return self.form.cleaned_data.get(f'{name}_mode') or MATCH_ANY
+
+    def filter_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        slugs = self.get_slugs(name, value)
+        if self.get_mode(name) == MATCH_ALL and len(slugs) > 1:
+            return queryset.none()
+        return queryset.filter(category__slug__in=slugs)
+
+    def filter_genre(self, queryset, name, value):
+        """
+        Фильтр по жанрам подзапросом к связующей таблице.
+
+        Режим or — IN по слагам, режим and — GROUP BY по произведению
+        с HAVING на число совпавших жанров. Основной запрос не
+        соединяется с жанрами, поэтому дубликатов строк нет.
+        """
+        slugs = self.get_slugs(name, value)
+        links = Title.genre.through.objects.filter(
+            genre__slug__in=slugs
+        ).order_by()
+        if self.get_mode(name) == MATCH_ALL:
+            links = links.values('title_id').annotate(
+                matched=Count('genre_id', distinct=True)
+            ).filter(matched=len(slugs))
+        return queryset.filter(pk__in=links.values('title_id'))
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+
+def get_title_facets(titles=None):
+    """
+    Количество произведений по жанрам и категориям.
+
+    Для отфильтрованного набора titles считается двумя агрегирующими
+    запросами. Без фильтров счётчики берутся из таблицы лучших
+    произведений, где у каждого произведения есть строка в разрезе
+    его категории и каждого жанра.
+    """
+    if titles is None:
+        counts = {
+            (scope, scope_id): count
+            for scope, scope_id, count in TitleRanking.objects.filter(
+                scope__in=(RANKING_CATEGORY, RANKING_GENRE)
+            ).values('scope', 'scope_id').annotate(
+                count=Count('id')
+            ).values_list('scope', 'scope_id', 'count').order_by()
+        }
+        return {
+            'genre': [
+                {'slug': slug, 'name': name,
+                 'count': counts[RANKING_GENRE, pk]}
+                for pk, slug, name in Genre.objects.values_list(
+                    'pk', 'slug', 'name'
+                ) if (RANKING_GENRE, pk) in counts
+            ],
+            'category': [
+                {'slug': slug, 'name': name,
+                 'count': counts[RANKING_CATEGORY, pk]}
+                for pk, slug, name in Category.objects.values_list(
+                    'pk', 'slug', 'name'
+                ) if (RANKING_CATEGORY, pk) in counts
+            ],
+        }
+    titles = titles.order_by().values('pk')
+    return {
+        model._meta.model_name: list(
+            model.objects.filter(titles__in=titles).annotate(
+                count=Count('titles', distinct=True)
+            ).values('slug', 'name', 'count')
+        )
+        for model in (Genre, Category)
+    }
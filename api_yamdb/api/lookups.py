@@ -0,0 +1,78 @@
+import threading
+
+from django.http import Http404
+
+from reviews.models import Category, Genre, TableVersion
+
+
+class LookupCache:
+    """
+    Кэш строк небольшой справочной таблицы в памяти процесса.
+
+    Строки доступны по id и по слагу. Актуальность сверяется с версией
+    таблицы в БД не чаще одного раза за запрос, поэтому все процессы
+    видят изменения, сделанные любым из них, без общего кэш-сервера.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.name = model._meta.label_lower
+        self.version = None
+        self.objects = []
+        self.by_id = {}
+        self.by_slug = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __deepcopy__(self, memo):
+        # Поля сериализаторов копируются вместе с аргументами,
+        # а кэш должен оставаться общим для процесса.
+        return self
+
+    def expire(self):
+        """Требует сверить версию при следующем обращении в этом потоке."""
+        self.local.checked = False
+
+    def refresh(self):
+        if getattr(self.local, 'checked', False):
+            return
+        version = TableVersion.objects.get_version(self.name)
+        if version != self.version:
+            objects = list(self.model.objects.all())
+            with self.lock:
+                self.objects = objects
+                self.by_id = {obj.pk: obj for obj in objects}
+                self.by_slug = {obj.slug: obj for obj in objects}
+                self.version = version
+        self.local.checked = True
+
+    def all(self):
+        self.refresh()
+        return self.objects
+
+    def get_by_id(self, pk):
+        self.refresh()
+        return self.by_id.get(pk)
+
+    def get_by_slug(self, slug):
+        self.refresh()
+        return self.by_slug.get(slug)
+
+
+category_cache = LookupCache(Category)
+genre_cache = LookupCache(Genre)
+
+LOOKUP_CACHES = (category_cache, genre_cache)
+
+
+def expire_lookup_caches(**kwargs):
+    for lookup in LOOKUP_CACHES:
+        lookup.expire()
+
+
+def get_cached_or_404(lookup, slug):
+    """Объект справочника по слагу или ошибка 404."""
+    obj = lookup.get_by_slug(slug)
+    if obj is None:
+        raise Http404
+    return obj
@@ -0,0 +1,129 @@
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import get_catalog_version, get_version
+from .query_plan import build_query_plan
+
+
+class ConditionalListMixin:
+    """
+    Условные GET-запросы для list.
+
+    ETag и Last-Modified строятся из версии ресурса в таблице версий,
+    поэтому ответ 304 стоит одного запроса к БД (и запроса на каждого
+    родителя вложенного маршрута) и не требует сериализации.
+    Проверяется только ETag: Last-Modified имеет точность в секунду
+    и не различает изменения внутри одной секунды, поэтому
+    If-Modified-Since без ETag всегда получает полный ответ.
+
+    Родительские объекты вложенного маршрута проверяются до сравнения
+    ETag: для несуществующего родителя ответ — 404, а не 304.
+    """
+
+    def check_parents(self):
+        """Загружает родительские объекты; по умолчанию их нет."""
+
+    def get_version_key(self):
+        """Ключ версии ресурса; по умолчанию — версия каталога."""
+        return None
+
+    def get_resource_version(self):
+        key = self.get_version_key()
+        if key is None:
+            return get_catalog_version(self.request)
+        return get_version(key, self.request)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        self.check_parents()
+        version = self.get_resource_version()
+        etag = quote_etag(f'{self.basename}-{version}')
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if version:
+                # Округление вверх: время не раньше самого изменения.
+                response['Last-Modified'] = http_date(-(-version // 10 ** 9))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """Условные GET-запросы для list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class ParentResolverMixin:
+    """
+    Родительские объекты вложенного маршрута.
+
+    Каждый родитель загружается одним запросом и запоминается
+    на время обработки запроса (ViewSet создаётся на каждый запрос).
+    """
+
+    def resolve_parent(self, name, queryset, **lookups):
+        parents = self.__dict__.setdefault('parents', {})
+        if name not in parents:
+            parents[name] = get_object_or_404(queryset, **lookups)
+        return parents[name]
+
+
+class QueryPlanMixin:
+    """
+    Загрузка связанных данных по полям сериализатора.
+
+    План select_related/prefetch_related/only строится из полей
+    сериализатора текущего действия и применяется к каждому
+    набору, который отдаёт ViewSet (списки и get_object идут
+    через filter_queryset). only() применяется только при чтении,
+    чтобы сохранение не работало с отложенными полями.
+    """
+
+    def get_query_plan(self):
+        return build_query_plan(self.get_serializer())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.get_query_plan().apply(
+            queryset, defer=self.request.method in SAFE_METHODS
+        )
+
+
+class ThrottleFirstMixin:
+    """
+    Проверяет ограничения частоты до аутентификации и прав доступа.
+
+    Отклонённый запрос не загружает пользователя и не обращается
+    к БД. throttled_actions ограничивает проверку действиями
+    ViewSet; None — проверять все запросы.
+    """
+
+    throttled_actions = None
+
+    def get_throttles(self):
+        if (
+            self.throttled_actions is not None
+            and getattr(self, 'action', None) not in self.throttled_actions
+        ):
+            return []
+        return super().get_throttles()
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self.throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, 'throttles_checked', False):
+            super().check_throttles(request)
@@ -0,0 +1,202 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset) с непрозрачным курсором.
+
+    Курсор хранит значения полей сортировки последней записи страницы,
+    поэтому следующая страница выбирается условием по индексу
+    без OFFSET и без подсчёта общего числа записей.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+    @staticmethod
+    def split_field(field):
+        """Возвращает имя поля и признак сортировки по убыванию."""
+        if field.startswith('-'):
+            return field[1:], True
+        return field, False
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            name if descending else f'-{name}'
+            for name, descending in map(self.split_field, self.ordering)
+        )
+
+    def get_position_filter(self, ordering, position):
+        """Строит условие «строго после позиции» для составного ключа."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name, descending = self.split_field(field)
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {'p': position, 'r': int(reverse)},
+            default=str,
+            separators=(',', ':')
+        )
+        encoded = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request, model):
+        """
+        Разбирает курсор из запроса.
+
+        Значения позиции приводятся к типам полей сортировки, поэтому
+        подделанный курсор даёт 404, а не ошибку при выполнении запроса.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            position = payload['p']
+            reverse = bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                model._meta.get_field(self.split_field(field)[0])
+                .to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (DjangoValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        # Поля сортировки не допускают NULL.
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_position(self, obj):
+        return [
+            getattr(obj, self.split_field(field)[0])
+            for field in self.ordering
+        ]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с включаемым режимом курсоров.
+
+    По умолчанию работает как PageNumberPagination. Параметр
+    `pagination=cursor` или наличие курсора в запросе переключает
+    эндпоинт на KeysetPagination с сортировкой `keyset_ordering`.
+    Порядок страниц в этом режиме задаёт курсор, поэтому параметр
+    сортировки вместе с ним отклоняется.
+    """
+
+    mode_query_param = 'pagination'
+    keyset_mode = 'cursor'
+    keyset_ordering = None
+    keyset = None
+    ordering_not_supported_message = (
+        'Сортировка недоступна в режиме курсоров.'
+    )
+
+    def keyset_requested(self, request):
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.keyset_mode
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_ordering and self.keyset_requested(request):
+            if request.query_params.get(api_settings.ORDERING_PARAM):
+                raise ValidationError({
+                    api_settings.ORDERING_PARAM:
+                        [self.ordering_not_supported_message]
+                })
+            self.keyset = KeysetPagination(
+                self.keyset_ordering, self.get_page_size(request)
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TitlePagination(OptionalKeysetPagination):
+    """Пагинация произведений: курсор по названию и id."""
+
+    keyset_ordering = ('name', 'id')
+
+
+class PubDatePagination(OptionalKeysetPagination):
+    """Пагинация отзывов и комментариев: курсор по дате и id."""
+
+    keyset_ordering = ('-pub_date', '-id')
@@ -0,0 +1,137 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import relations, serializers
+
+
+class QueryPlan:
+    """
+    План загрузки связанных данных для сериализатора.
+
+    select_related — прямые связи, которые выводит сериализатор,
+    prefetch_related — связи «ко многим», only — столбцы, которые
+    достаточно выбрать (None, если их нельзя определить по полям).
+    """
+
+    def __init__(self, select_related=(), prefetch_related=(), only=None):
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+        self.only = only
+
+    def apply(self, queryset, defer=True):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if defer and self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def get_model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def build_query_plan(serializer, model=None, prefix=''):
+    """
+    Строит план по полям экземпляра сериализатора.
+
+    Вложенные сериализаторы и поля-связи превращаются в
+    select_related или prefetch_related, простые поля — в список
+    столбцов для only(). Поля с источником '*' могут перечислить
+    нужные им поля модели в атрибуте model_fields.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = model or serializer.Meta.model
+    plan = QueryPlan()
+    only = {model._meta.pk.name}
+    only.update(
+        field.name for field in model._meta.concrete_fields
+        if field.is_relation
+    )
+    known = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        columns = plan_field(plan, field, model, prefix)
+        if columns is None:
+            known = False
+        else:
+            only.update(columns)
+    plan.only = sorted(only) if known else None
+    return plan
+
+
+def plan_field(plan, field, model, prefix):
+    """
+    Добавляет в план связи поля сериализатора.
+
+    Возвращает столбцы, нужные полю, или None, если их нельзя
+    определить.
+    """
+    if field.source == '*':
+        return getattr(field, 'model_fields', None)
+    name = field.source_attrs[0]
+    model_field = get_model_field(model, name)
+    if model_field is None:
+        return None
+    if not model_field.is_relation:
+        return {name}
+    path = f'{prefix}{model_field.name}'
+    if model_field.many_to_many or model_field.one_to_many:
+        plan_to_many(plan, field, model_field, path)
+        return set()
+    return plan_forward(plan, field, model_field, path)
+
+
+def plan_to_many(plan, field, model_field, path):
+    """Связь «ко многим»: prefetch_related, для сериализатора — с планом."""
+    child = getattr(field, 'child', None) or getattr(
+        field, 'child_relation', None
+    )
+    if not isinstance(child, serializers.BaseSerializer):
+        plan.prefetch_related.append(path)
+        return
+    related_model = model_field.related_model
+    nested = build_query_plan(child, related_model)
+    plan.prefetch_related.append(Prefetch(
+        path, queryset=nested.apply(related_model.objects.all())
+    ))
+
+
+def plan_forward(plan, field, model_field, path):
+    """
+    Прямая связь: хватает внешнего ключа или нужен select_related.
+
+    Возвращает столбцы модели и связанной модели, нужные полю.
+    """
+    columns = {model_field.name}
+    if len(field.source_attrs) == 1 and (
+        field.source_attrs[0] == model_field.attname
+        or isinstance(field, relations.PrimaryKeyRelatedField)
+    ):
+        return columns
+    plan.select_related.append(path)
+    related_pk = model_field.related_model._meta.pk.name
+    if isinstance(field, serializers.BaseSerializer):
+        columns.update(plan_nested(plan, field, model_field, path))
+    elif isinstance(field, relations.SlugRelatedField):
+        columns.add(f'{model_field.name}__{field.slug_field}')
+        columns.add(f'{model_field.name}__{related_pk}')
+    elif len(field.source_attrs) == 2:
+        columns.add(f'{model_field.name}__{field.source_attrs[1]}')
+        columns.add(f'{model_field.name}__{related_pk}')
+    return columns
+
+
+def plan_nested(plan, field, model_field, path):
+    """Вложенный сериализатор прямой связи: его связи и столбцы."""
+    nested = build_query_plan(field, model_field.related_model, f'{path}__')
+    plan.select_related.extend(nested.select_related)
+    plan.prefetch_related.extend(nested.prefetch_related)
+    if nested.only is None:
+        return set()
+    return {f'{model_field.name}__{column}' for column in nested.only}
@@ -1,13 +1,21 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django.utils.encoding import smart_str
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from reviews.constants import EMAIL_LENGTH, USER, USERNAME_LENGTH
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from reviews.constants import (EMAIL_LENGTH, LEADERBOARD_MIN_REVIEWS,
+                               LEADERBOARD_SIZE, MAX_BULK_TITLES,
+                               MAX_LEADERBOARD_SIZE, MAX_SLUG_LENGTH, USER,
+                               USERNAME_LENGTH)
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
 from reviews.validators import username_validator
+from .authentication import ClaimsRefreshToken
 from .email_func import send_code_to_email
+from .lookups import category_cache, genre_cache
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -28,44 +36,289 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """Поле-слаг, которое ищет объект в кэше справочника, а не в БД."""
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        kwargs.setdefault('queryset', lookup.model.objects.all())
+        super().__init__(slug_field='slug', **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)):
+            self.fail('invalid')
+        obj = self.lookup.get_by_slug(str(data))
+        if obj is None:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return obj
+
+
+class CachedCategoryField(serializers.Field):
+    """Категория произведения из кэша справочника по category_id."""
+
+    def __init__(self, **kwargs):
+        super().__init__(source='category_id', read_only=True, **kwargs)
+
+    def to_representation(self, value):
+        return CategorySerializer(category_cache.get_by_id(value)).data
+
+
+class CachedGenresField(serializers.Field):
+    """
+    Жанры произведения из кэша справочника.
+
+    Id жанров берутся из атрибута genre_ids, который заполняет
+    TitleListSerializer, или из связующей таблицы.
+    """
+
+    model_fields = ('id',)
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, title):
+        genre_ids = getattr(title, 'genre_ids', None)
+        if genre_ids is None:
+            genre_ids = Title.genre.through.objects.filter(
+                title_id=title.pk
+            ).values_list('genre_id', flat=True)
+        genres = sorted(
+            filter(None, map(genre_cache.get_by_id, genre_ids)),
+            key=lambda genre: genre.name
+        )
+        return GenreSerializer(genres, many=True).data
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """Загружает id жанров всех произведений списка одним запросом."""
+
+    def to_representation(self, data):
+        titles = list(data.all() if hasattr(data, 'all') else data)
+        genre_ids = {title.pk: [] for title in titles}
+        for title_id, genre_id in Title.genre.through.objects.filter(
+            title_id__in=genre_ids
+        ).values_list('title_id', 'genre_id'):
+            genre_ids[title_id].append(genre_id)
+        for title in titles:
+            title.genre_ids = genre_ids[title.pk]
+        return super().to_representation(titles)
+
+
 class TitleSerializerForRead(serializers.ModelSerializer):
-    """Сериализатор данных модели произведения для чтения."""
+    """
+    Сериализатор данных модели произведения для чтения.
+
+    Категория и жанры берутся из кэша справочников.
+    Гистограмма оценок выводится, только если в запросе
+    передан параметр histogram.
+    """
 
-    genre = GenreSerializer(many=True)
-    category = CategorySerializer(read_only=True)
+    genre = CachedGenresField()
+    category = CachedCategoryField()
     rating = serializers.IntegerField(read_only=True)
+    score_histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True
+    )
 
     class Meta:
         model = Title
         fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category'
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category', 'score_histogram'
         )
+        list_serializer_class = TitleListSerializer
+
+    def get_field_names(self, declared_fields, info):
+        fields = super().get_field_names(declared_fields, info)
+        request = self.context.get('request')
+        if request is None or 'histogram' not in request.query_params:
+            fields = tuple(
+                field for field in fields if field != 'score_histogram'
+            )
+        return fields
 
 
 class TitleSerializerForWrite(serializers.ModelSerializer):
     """Сериализатор данных модели произведения для записи."""
 
-    category = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        slug_field='slug',
+    category = CachedSlugRelatedField(
+        lookup=category_cache,
         required=True
     )
-    genre = serializers.SlugRelatedField(
-        queryset=Genre.objects.all(),
+    genre = CachedSlugRelatedField(
+        lookup=genre_cache,
         many=True,
-        slug_field='slug',
         allow_null=False,
         allow_empty=False
     )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
     def to_representation(self, instance):
         return TitleSerializerForRead(instance).data
 
 
+class TitleBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор одного произведения при массовом создании.
+
+    Категория и жанры принимаются как слаги и разрешаются
+    для всей пачки в TitleBulkCreateSerializer.
+    """
+
+    category = serializers.SlugField(max_length=MAX_SLUG_LENGTH)
+    genre = serializers.ListField(
+        child=serializers.SlugField(max_length=MAX_SLUG_LENGTH),
+        allow_empty=False
+    )
+
+    class Meta:
+        model = Title
+        fields = ('name', 'year', 'description', 'genre', 'category')
+
+
+class TitleBulkCreateSerializer(serializers.Serializer):
+    """
+    Сериализатор массового создания произведений.
+
+    Принимает список произведений, проверяет его за один проход,
+    разрешая слаги по кэшу справочников, и создаёт корректные
+    произведения через bulk_create.
+    Возвращает результат по каждому элементу: id или ошибки.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError(
+                {'non_field_errors': ['Ожидается непустой список.']}
+            )
+        if len(data) > MAX_BULK_TITLES:
+            raise serializers.ValidationError({'non_field_errors': [
+                f'Нельзя создать больше {MAX_BULK_TITLES} произведений '
+                'за один запрос.'
+            ]})
+        return {'items': data}
+
+    def validate(self, attrs):
+        items = []
+        for data in attrs['items']:
+            serializer = TitleBulkItemSerializer(data=data)
+            if serializer.is_valid():
+                items.append((serializer.validated_data, None))
+            else:
+                items.append((None, serializer.errors))
+        categories = {
+            category.slug: category for category in category_cache.all()
+        }
+        genres = {genre.slug: genre for genre in genre_cache.all()}
+        for index, (item, _) in enumerate(items):
+            if item is None:
+                continue
+            errors = {}
+            if item['category'] not in categories:
+                errors['category'] = [
+                    f'Категория {item["category"]} не существует.'
+                ]
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                errors['genre'] = [
+                    f'Жанр {slug} не существует.' for slug in missing
+                ]
+            if errors:
+                items[index] = (None, errors)
+        attrs['items'] = items
+        attrs['categories'] = categories
+        attrs['genres'] = genres
+        return attrs
+
+    @staticmethod
+    def create_titles(titles):
+        """
+        Создаёт произведения и проставляет им id.
+
+        СУБД, которые возвращают id из bulk_create (PostgreSQL),
+        проставляют их сами. SQLite в Django 3.2 id не возвращает,
+        и они читаются обратно. Это верно только для SQLite: вставка
+        и чтение идут в одной транзакции, первая вставка берёт
+        блокировку записи всей базы, и до фиксации никто другой
+        в таблицу не пишет. Поэтому последние id таблицы, выданные
+        автоинкрементом подряд, принадлежат этой вставке. На других
+        СУБД без возврата id такой гарантии нет, и произведения
+        сохраняются по одному.
+        """
+        connection = transaction.get_connection()
+        with transaction.atomic(savepoint=False):
+            if connection.features.can_return_rows_from_bulk_insert:
+                Title.objects.bulk_create(titles)
+            elif connection.vendor == 'sqlite':
+                Title.objects.bulk_create(titles)
+                ids = Title.objects.order_by('-id').values_list(
+                    'id', flat=True
+                )[:len(titles)]
+                for title, pk in zip(titles, reversed(list(ids))):
+                    title.pk = pk
+            else:
+                for title in titles:
+                    title.save()
+
+    def create(self, validated_data):
+        categories = validated_data['categories']
+        genres = validated_data['genres']
+        valid = [item for item, _ in validated_data['items'] if item]
+        titles = [
+            Title(
+                name=item['name'],
+                year=item['year'],
+                description=item.get('description'),
+                category=categories[item['category']],
+            )
+            for item in valid
+        ]
+        through = Title.genre.through
+        with transaction.atomic():
+            self.create_titles(titles)
+            through.objects.bulk_create([
+                through(title_id=title.pk, genre_id=genres[slug].pk)
+                for title, item in zip(titles, valid)
+                for slug in dict.fromkeys(item['genre'])
+            ])
+            TitleRanking.objects.rebuild([title.pk for title in titles])
+        created = iter(titles)
+        return [
+            {'id': next(created).pk, 'name': item['name']}
+            if item else {'errors': errors}
+            for item, errors in validated_data['items']
+        ]
+
+
+class LeaderboardParamsSerializer(serializers.Serializer):
+    """Сериализатор параметров таблицы лучших произведений."""
+
+    category = serializers.SlugField(
+        max_length=MAX_SLUG_LENGTH, required=False
+    )
+    genre = serializers.SlugField(max_length=MAX_SLUG_LENGTH, required=False)
+    min_reviews = serializers.IntegerField(
+        min_value=1, default=LEADERBOARD_MIN_REVIEWS
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_LEADERBOARD_SIZE, default=LEADERBOARD_SIZE
+    )
+
+    def validate(self, data):
+        if 'category' in data and 'genre' in data:
+            raise serializers.ValidationError(
+                'Укажите либо категорию, либо жанр.'
+            )
+        return data
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор данных модели отзывов."""
 
@@ -117,9 +370,43 @@ class GetTokenSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         user = validated_data['user']
-        user.is_active = True
-        user.save()
-        return str(RefreshToken.for_user(user).access_token)
+        if not user.is_active:
+            user.is_active = True
+            user.save(update_fields=('is_active',))
+        return ClaimsRefreshToken.for_user(user)
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    """
+    Сериализатор для обновления токенов по refresh-токену.
+
+    Refresh-токен одноразовый: после обмена он попадает в чёрный
+    список, а клиент получает новую пару токенов. Роль для новых
+    токенов берётся из БД, чтобы её изменения доходили до клиента.
+    """
+
+    refresh = serializers.CharField(required=True)
+
+    def validate(self, data):
+        try:
+            token = ClaimsRefreshToken(data['refresh'])
+        except TokenError as error:
+            raise InvalidToken(error.args[0])
+        user = User.objects.filter(
+            pk=token[jwt_settings.USER_ID_CLAIM], is_active=True
+        ).only('id', 'username', 'role', 'is_staff').first()
+        if user is None:
+            raise InvalidToken('Пользователь не найден')
+        data['token'] = token
+        data['user'] = user
+        return data
+
+    @transaction.atomic
+    def create(self, validated_data):
+        _, created = validated_data['token'].blacklist()
+        if not created:
+            raise InvalidToken('Токен уже использован')
+        return ClaimsRefreshToken.for_user(validated_data['user'])
 
 
 class UserSerializer(serializers.ModelSerializer):
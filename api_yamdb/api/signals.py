@@ -0,0 +1,134 @@
+from threading import local
+
+from django.core.signals import request_started
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+from .cache import (bump_catalog_version, bump_version_on_commit,
+                    get_comments_version_key, get_reviews_version_key)
+from .lookups import expire_lookup_caches
+
+CATALOG_MODELS = (Category, Genre, Review, Title)
+
+# Произведения и пользователи, которые удаляются в текущем потоке.
+# Их отзывы удаляются каскадом, и рейтинг учитывает это один раз
+# на всё удаление, а не запросами на каждый отзыв.
+deleting = local()
+
+
+def get_deleting(model):
+    return deleting.__dict__.setdefault(model, set())
+
+
+@receiver(request_started)
+def reset_deleting(**kwargs):
+    """Забывает удаления, прерванные ошибкой в прошлом запросе."""
+    deleting.__dict__.clear()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog(sender, **kwargs):
+    """Сбрасывает кэш каталога при изменении его моделей."""
+    if sender in CATALOG_MODELS:
+        bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_catalog_genres(sender, action, **kwargs):
+    """Сбрасывает кэш каталога при изменении жанров произведения."""
+    if action.startswith('post_'):
+        bump_catalog_version()
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, raw=False, **kwargs):
+    """Учитывает оценку созданного или изменённого отзыва в рейтинге."""
+    if raw:
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    old_score = None if created else getattr(instance, 'saved_score', None)
+    if created or old_score is not None:
+        if instance.score != old_score:
+            titles.update_scores(
+                new_score=instance.score, old_score=old_score
+            )
+    else:
+        # Прежняя оценка неизвестна: отзыв сохранён без загрузки из БД.
+        titles.recalculate_rating()
+        TitleRanking.objects.filter(title_id=instance.title_id).refresh()
+    instance.saved_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, **kwargs):
+    """Исключает оценку удалённого отзыва из рейтинга произведения."""
+    if (
+        instance.title_id in get_deleting(Title)
+        or instance.author_id in get_deleting(User)
+    ):
+        return
+    Title.objects.filter(pk=instance.title_id).update_scores(
+        old_score=instance.score
+    )
+
+
+@receiver(pre_delete, sender=Title)
+def start_title_delete(sender, instance, **kwargs):
+    """Рейтинг удаляемого произведения пересчитывать не нужно."""
+    get_deleting(Title).add(instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def finish_title_delete(sender, instance, **kwargs):
+    get_deleting(Title).discard(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def start_user_delete(sender, instance, **kwargs):
+    """Запоминает произведения, отзывы на которые удалятся с автором."""
+    get_deleting(User).add(instance.pk)
+    instance.reviewed_title_ids = list(
+        Review.objects.filter(author=instance).values_list(
+            'title_id', flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=User)
+def finish_user_delete(sender, instance, **kwargs):
+    """Пересчитывает рейтинг произведений после удаления автора."""
+    get_deleting(User).discard(instance.pk)
+    title_ids = getattr(instance, 'reviewed_title_ids', None)
+    if title_ids:
+        Title.objects.filter(pk__in=title_ids).recalculate_rating()
+        TitleRanking.objects.filter(title_id__in=title_ids).refresh()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, instance, **kwargs):
+    """Обновляет версию отзывов произведения."""
+    bump_version_on_commit(get_reviews_version_key(instance.title_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    """Обновляет версию комментариев к отзыву."""
+    bump_version_on_commit(get_comments_version_key(instance.review_id))
+
+
+request_started.connect(expire_lookup_caches)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def expire_lookups(sender, **kwargs):
+    """Сверяет справочники с БД после их изменения в этом потоке."""
+    expire_lookup_caches()
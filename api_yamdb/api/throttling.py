@@ -0,0 +1,254 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import ClaimsJWTAuthentication
+
+try:
+    import fcntl
+except ImportError:
+    # Без fcntl (Windows) счётчики согласованы только внутри процесса.
+    fcntl = None
+
+# Слот счётчика: хэш ключа, номер окна, длина окна в секундах,
+# число запросов в текущем и в предыдущем окне.
+SLOT = struct.Struct('=QqIII')
+
+# Сколько соседних слотов просматривается при поиске места для ключа:
+PROBES = 8
+
+
+class SharedWindowCounters:
+    """
+    Счётчики скользящего окна в файле, отображённом в память.
+
+    Все процессы-обработчики на сервере открывают один файл и видят
+    общие счётчики. Таблица имеет фиксированный размер: ключ попадает
+    в один из PROBES слотов по своему хэшу, при нехватке места
+    вытесняется счётчик с самым старым окном. Изменения защищены
+    блокировкой файла между процессами и обычной блокировкой
+    между потоками.
+    """
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        # Файл доступен только владельцу процесса сервера.
+        self.file = os.fdopen(
+            os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b'
+        )
+        size = slots * SLOT.size
+        if os.fstat(self.file.fileno()).st_size != size:
+            self.lock_file()
+            try:
+                if os.fstat(self.file.fileno()).st_size != size:
+                    self.file.truncate(size)
+            finally:
+                self.unlock_file()
+        self.memory = mmap.mmap(self.file.fileno(), size)
+
+    def close(self):
+        self.memory.close()
+        self.file.close()
+
+    def lock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def hash_key(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # Нулевой хэш обозначает пустой слот.
+        return int.from_bytes(digest, 'little') or 1
+
+    def find_slot(self, key_hash, now):
+        """Слот ключа, свободный слот или слот с самым старым окном."""
+        start = key_hash % self.slots
+        victim = victim_end = None
+        for probe in range(PROBES):
+            slot = (start + probe) % self.slots
+            stored, window, duration, _, _ = SLOT.unpack_from(
+                self.memory, slot * SLOT.size
+            )
+            if stored == key_hash or stored == 0:
+                return slot
+            end = (window + 2) * duration
+            if end <= now:
+                return slot
+            if victim is None or end < victim_end:
+                victim, victim_end = slot, end
+        return victim
+
+    def hit(self, key, limit, duration, now):
+        """
+        Учитывает запрос, если он укладывается в лимит.
+
+        Число запросов за скользящее окно оценивается по текущему окну
+        и доле предыдущего. Возвращает признак того, что запрос
+        разрешён, и время ожидания в секундах для отклонённого.
+        """
+        key_hash = self.hash_key(key)
+        index, offset = divmod(now, duration)
+        index = int(index)
+        with self.lock:
+            self.lock_file()
+            try:
+                slot = self.find_slot(key_hash, now)
+                position = slot * SLOT.size
+                stored, window, _, current, previous = SLOT.unpack_from(
+                    self.memory, position
+                )
+                if stored != key_hash or window < index - 1:
+                    current = previous = 0
+                elif window == index - 1:
+                    current, previous = 0, current
+                weight = 1 - offset / duration
+                allowed = previous * weight + current < limit
+                if allowed:
+                    current += 1
+                SLOT.pack_into(
+                    self.memory, position,
+                    key_hash, index, duration, current, previous
+                )
+            finally:
+                self.unlock_file()
+        if allowed:
+            return True, None
+        if current >= limit or not previous:
+            return False, duration - offset
+        # Оценка опустится ниже лимита, когда доля предыдущего окна
+        # уменьшится до (limit - current) / previous.
+        return False, max(
+            duration * (1 - (limit - current) / previous) - offset, 0
+        )
+
+
+_counters = None
+_counters_lock = threading.Lock()
+
+
+def get_counters():
+    """Счётчики текущего процесса; после fork файл открывается заново."""
+    global _counters
+    path = settings.THROTTLE_FILE
+    counters = _counters
+    if (
+        counters is not None
+        and counters.path == path
+        and counters.pid == os.getpid()
+    ):
+        return counters
+    with _counters_lock:
+        if _counters is not None:
+            _counters.close()
+        _counters = SharedWindowCounters(path, settings.THROTTLE_SLOTS)
+        return _counters
+
+
+class SharedRateThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов на общих счётчиках скользящего окна.
+
+    Лимиты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    по scope. Ключ строится без обращений к БД.
+    """
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'No default throttle rate set for {self.scope!r} scope'
+            )
+
+    def get_ident_key(self, ident):
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_time = get_counters().hit(
+            key, self.num_requests, self.duration, self.timer()
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPRateThrottle(SharedRateThrottle):
+    """Ограничение по IP-адресу клиента."""
+
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(self.get_ident(request))
+
+
+class UsernameRateThrottle(SharedRateThrottle):
+    """
+    Ограничение по имени пользователя из тела запроса.
+
+    Сдерживает подбор кода подтверждения к одной учётной записи
+    с разных адресов.
+    """
+
+    scope = 'auth_username'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            return None
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return self.get_ident_key(username)
+
+
+class UserRateThrottle(SharedRateThrottle):
+    """
+    Ограничение по пользователю из access-токена.
+
+    Пользователь определяется по утверждениям проверенного токена,
+    без загрузки из БД. Без действующего токена ограничение
+    применяется к IP-адресу.
+    """
+
+    scope = 'content'
+
+    def get_user_id(self, request):
+        authentication = ClaimsJWTAuthentication()
+        header = authentication.get_header(request)
+        if header is None:
+            return None
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        try:
+            token = authentication.get_validated_token(raw_token)
+        except AuthenticationFailed:
+            return None
+        return token.get(jwt_settings.USER_ID_CLAIM)
+
+    def get_cache_key(self, request, view):
+        user_id = self.get_user_id(request)
+        if user_id is None:
+            return self.get_ident_key(f'ip:{self.get_ident(request)}')
+        return self.get_ident_key(user_id)
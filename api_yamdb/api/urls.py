@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    APITokenObtainView, APIUserViewSet, ReviewViewSet,
-                    APISignup, TitleViewSet)
+                    APITokenObtainView, APITokenRefreshView, APIUserViewSet,
+                    ReviewViewSet, APISignup, TitleViewSet)
 
 router = DefaultRouter()
 router.register(
@@ -32,6 +32,11 @@ authurl = [
         APITokenObtainView.as_view(),
         name='token_obtain_pair'
     ),
+    path(
+        'token/refresh/',
+        APITokenRefreshView.as_view(),
+        name='token_refresh'
+    ),
 ]
 
 urlpatterns = [
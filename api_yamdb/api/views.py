@@ -1,5 +1,4 @@
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (filters, permissions, status, views,
                             viewsets, mixins)
@@ -9,24 +8,39 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
-from reviews.models import Category, Genre, Review, Title, User
-from .filters import TitleFilter
+from reviews.constants import RANKING_ALL, RANKING_CATEGORY, RANKING_GENRE
+from reviews.models import Category, Genre, Review, Title, TitleRanking, User
+from .authentication import ClaimsJWTAuthentication, get_user_instance
+from .cache import (bump_catalog_version, get_cached_list,
+                    get_comments_version_key, get_reviews_version_key)
+from .filters import TitleFilter, get_title_facets
+from .lookups import category_cache, genre_cache, get_cached_or_404
+from .mixins import (ConditionalGetMixin, ConditionalListMixin,
+                     ParentResolverMixin, QueryPlanMixin, ThrottleFirstMixin)
+from .pagination import PubDatePagination, TitlePagination
 from .permissions import (IsAdminOrReadOnly, IsAdminOrStaffPermission,
                           IsAuthorOrModerPermission)
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, GetTokenSerializer,
+                          LeaderboardParamsSerializer,
                           NotAdminSerializer, ReviewSerializer,
-                          SignUpSerializer, TitleSerializerForRead,
-                          TitleSerializerForWrite, UserSerializer)
+                          SignUpSerializer, TitleBulkCreateSerializer,
+                          TitleSerializerForRead,
+                          TitleSerializerForWrite, TokenRefreshSerializer,
+                          UserSerializer)
+from .throttling import (IPRateThrottle, UsernameRateThrottle,
+                         UserRateThrottle)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, QueryPlanMixin,
+                   viewsets.ModelViewSet):
     """ViewSet модели произведения."""
 
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).all()
+    queryset = Title.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = TitleFilter
+    pagination_class = TitlePagination
     ordering_fields = ('id', 'name', 'year')
     http_method_names = ('get', 'post', 'patch', 'delete')
 
@@ -35,18 +49,135 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleSerializerForWrite
         return TitleSerializerForRead
 
+    def list(self, request, *args, **kwargs):
+        """Отдаём список произведений из кэша версии каталога."""
+        return self.conditional_response(
+            request, self.cached_list, *args, **kwargs
+        )
 
-class CategoryGenreViewSet(mixins.CreateModelMixin,
+    @action(methods=('POST',), detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Массовое создание произведений.
+
+        Возвращает результат по каждому элементу запроса в том же порядке.
+        """
+        serializer = TitleBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        bump_catalog_version()
+        if any('id' in result for result in results):
+            return Response(results, status=status.HTTP_201_CREATED)
+        return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=('GET',), detail=False, url_path='leaderboard')
+    def leaderboard(self, request):
+        """
+        Лучшие произведения: все, в категории или в жанре.
+
+        Параметры: category или genre (слаг), min_reviews, limit.
+        """
+        return self.conditional_response(request, self.cached_leaderboard)
+
+    def cached_leaderboard(self, request):
+        return Response(get_cached_list(
+            'titles:leaderboard', request,
+            lambda: self.get_leaderboard(request)
+        ))
+
+    def get_leaderboard(self, request):
+        params = LeaderboardParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        scope, scope_id = RANKING_ALL, 0
+        if 'category' in params:
+            scope = RANKING_CATEGORY
+            scope_id = get_cached_or_404(
+                category_cache, params['category']
+            ).pk
+        elif 'genre' in params:
+            scope = RANKING_GENRE
+            scope_id = get_cached_or_404(genre_cache, params['genre']).pk
+        rankings = TitleRanking.objects.leaderboard(
+            scope, scope_id, params['min_reviews']
+        ).select_related('title')[:params['limit']]
+        serializer = TitleSerializerForRead(
+            [ranking.title for ranking in rankings],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return [
+            {'rank': rank, **data}
+            for rank, data in enumerate(serializer.data, start=1)
+        ]
+
+    def cached_list(self, request, *args, **kwargs):
+        return Response(get_cached_list(
+            'titles:list', request,
+            lambda: self.get_list_data(request, *args, **kwargs)
+        ))
+
+    def get_list_data(self, request, *args, **kwargs):
+        """
+        Данные списка произведений.
+
+        С параметром facets добавляет количество произведений
+        по жанрам и категориям для текущего набора фильтров.
+        """
+        data = mixins.ListModelMixin.list(self, request, *args, **kwargs).data
+        if 'facets' in request.query_params:
+            filtered = any(
+                request.query_params.get(name)
+                for name in TitleFilter.base_filters
+            )
+            data['facets'] = get_title_facets(
+                self.filter_queryset(self.get_queryset())
+                if filtered else None
+            )
+        return data
+
+
+class CategoryGenreViewSet(ConditionalListMixin,
+                           QueryPlanMixin,
+                           mixins.CreateModelMixin,
                            mixins.ListModelMixin,
                            mixins.DestroyModelMixin,
                            viewsets.GenericViewSet):
-    """Базовый ViewSet для категории и жанра."""
+    """
+    Базовый ViewSet для категории и жанра.
+
+    Список и поиск объекта по слагу обслуживаются из кэша
+    справочника lookup_cache без запросов к таблице.
+    """
 
     pagination_class = PageNumberPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
     permission_classes = (IsAdminOrReadOnly,)
+    lookup_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.cached_list)
+
+    def cached_list(self, request):
+        objects = self.lookup_cache.all()
+        terms = filters.SearchFilter().get_search_terms(request)
+        if terms:
+            objects = [
+                obj for obj in objects
+                if all(term.lower() in obj.name.lower() for term in terms)
+            ]
+        page = self.paginate_queryset(objects)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_object(self):
+        obj = get_cached_or_404(
+            self.lookup_cache, self.kwargs[self.lookup_field]
+        )
+        self.check_object_permissions(self.request, obj)
+        return obj
 
 
 class GenreViewSet(CategoryGenreViewSet):
@@ -54,6 +185,7 @@ class GenreViewSet(CategoryGenreViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    lookup_cache = genre_cache
 
 
 class CategoryViewSet(CategoryGenreViewSet):
@@ -61,30 +193,60 @@ class CategoryViewSet(CategoryGenreViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    lookup_cache = category_cache
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ThrottleFirstMixin, ConditionalGetMixin,
+                    ParentResolverMixin, QueryPlanMixin,
+                    viewsets.ModelViewSet):
     """ViewSet модели отзывов."""
 
+    throttle_classes = (UserRateThrottle,)
+    throttled_actions = ('create',)
     serializer_class = ReviewSerializer
+    pagination_class = PubDatePagination
     http_method_names = ('get', 'post', 'patch', 'delete')
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,
                           IsAuthorOrModerPermission,)
 
+    def check_parents(self):
+        self.get_title()
+
+    def get_version_key(self):
+        return get_reviews_version_key(self.kwargs['title_id'])
+
     def get_title(self):
         """Получаем произведение для отзыва."""
-        return get_object_or_404(Title, pk=self.kwargs['title_id'])
+        return self.resolve_parent(
+            'title', Title, pk=self.kwargs['title_id']
+        )
 
     def get_queryset(self):
         """Получаем отзывы к конкретному произведению."""
         return self.get_title().reviews.all()
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Добавляем авторизованного пользователя к отзыву."""
+        """
+        Добавляем авторизованного пользователя к отзыву.
+
+        Рейтинг произведения обновляют сигналы отзыва (api/signals.py),
+        в той же транзакции, что и сам отзыв.
+        """
         serializer.save(author=self.request.user, title=self.get_title())
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Сохраняем отзыв вместе с изменением рейтинга произведения."""
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Удаляем отзыв вместе с изменением рейтинга произведения."""
+        instance.delete()
 
-class APIUserViewSet(viewsets.ModelViewSet):
+
+class APIUserViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     """
     Управляет адресами, начинающимися с users/.
     Права доступа: различаются в зависимости от пользовательских ролей.
@@ -105,7 +267,7 @@ class APIUserViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
         url_path='me')
     def get_current_user_info(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(get_user_instance(request.user))
         return Response(serializer.data)
 
     @get_current_user_info.mapping.patch
@@ -124,7 +286,7 @@ class APIUserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class APISignup(views.APIView):
+class APISignup(ThrottleFirstMixin, views.APIView):
     """
     Получить код подтверждения на переданный email.
     Права доступа: Доступно без токена.
@@ -133,6 +295,7 @@ class APISignup(views.APIView):
     """
 
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (IPRateThrottle,)
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
@@ -141,32 +304,82 @@ class APISignup(views.APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class APITokenObtainView(views.APIView):
+def token_pair_response(refresh):
+    return Response(
+        {'token': str(refresh.access_token), 'refresh': str(refresh)},
+        status=status.HTTP_200_OK
+    )
+
+
+class APITokenObtainView(ThrottleFirstMixin, views.APIView):
     """
     Получение JWT-токена в обмен на username и confirmation code.
     Права доступа: Доступно без токена.
+    Вместе с access-токеном выдаётся refresh-токен для его обновления.
     """
 
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (IPRateThrottle, UsernameRateThrottle)
 
     def post(self, request):
         serializer = GetTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        token = serializer.save()
-        return Response({'token': token}, status=status.HTTP_200_OK)
+        return token_pair_response(serializer.save())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class APITokenRefreshView(ThrottleFirstMixin, views.APIView):
+    """
+    Обмен refresh-токена на новую пару токенов.
+    Права доступа: Доступно без токена.
+    Каждый refresh-токен можно использовать только один раз.
+    """
+
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+    throttle_classes = (IPRateThrottle,)
+
+    def get_authenticate_header(self, request):
+        # Без классов аутентификации DRF заменил бы 401 на 403.
+        return ClaimsJWTAuthentication().authenticate_header(request)
+
+    def post(self, request):
+        serializer = TokenRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return token_pair_response(serializer.save())
+
+
+class CommentViewSet(ThrottleFirstMixin, ConditionalGetMixin,
+                     ParentResolverMixin, QueryPlanMixin,
+                     viewsets.ModelViewSet):
     """Viewset модели комментариев."""
 
+    throttle_classes = (UserRateThrottle,)
+    throttled_actions = ('create',)
     serializer_class = CommentSerializer
+    pagination_class = PubDatePagination
     http_method_names = ('get', 'post', 'patch', 'delete')
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,
                           IsAuthorOrModerPermission,)
 
+    def check_parents(self):
+        self.get_review()
+
+    def get_version_key(self):
+        return get_comments_version_key(self.kwargs['review_id'])
+
     def get_review(self):
-        """Получаем отзыв для комментария."""
-        return get_object_or_404(Review, pk=self.kwargs['review_id'])
+        """
+        Получаем отзыв для комментария.
+
+        Отзыв и его произведение проверяются одним запросом:
+        отзыв другого произведения даёт 404.
+        """
+        return self.resolve_parent(
+            'review',
+            Review.objects.select_related('title'),
+            pk=self.kwargs['review_id'],
+            title_id=self.kwargs['title_id']
+        )
 
     def get_queryset(self):
         """Получаем комментарии к конкретному отзыву."""
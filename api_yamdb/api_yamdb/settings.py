@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'djoser',
     'django_filters',
     'reviews.apps.ReviewsConfig',
@@ -107,18 +108,54 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+
+    'DEFAULT_THROTTLE_RATES': {
+        # Регистрация и получение токенов — на IP-адрес:
+        'auth': '20/minute',
+        # Попытки получить токен для одного пользователя:
+        'auth_username': '5/minute',
+        # Создание отзывов и комментариев — на пользователя:
+        'content': '30/minute',
+    },
+    # Число прокси перед приложением. При 0 клиент определяется по
+    # REMOTE_ADDR, а X-Forwarded-For, который клиент может подделать,
+    # не учитывается. За одним обратным прокси нужно указать 1.
+    'NUM_PROXIES': 0,
 }
 
+# Файл счётчиков ограничения частоты, общий для процессов сервера,
+# и количество счётчиков в нём. Файл лежит в каталоге проекта, а не
+# в общем временном каталоге, где его могут подменить другие
+# пользователи системы:
+THROTTLE_FILE = os.path.join(BASE_DIR, 'throttle')
+THROTTLE_SLOTS = 2 ** 16
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Время жизни закэшированных ответов каталога, в секундах:
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'api.authentication.ClaimsUser',
 }
 
+# Сколько проверенных access-токенов помнит каждый процесс:
+VERIFIED_TOKEN_CACHE_SIZE = 1024
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, User, Review, Title
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 admin.site.empty_value_display = 'Здесь пока ничего нет:('
 
@@ -132,3 +133,23 @@ class CommentAdmin(admin.ModelAdmin):
         'review',
         'author',
     )
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    """Админ панель очереди писем."""
+
+    list_display = (
+        'recipient',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    )
+    search_fields = (
+        'recipient',
+    )
+    list_filter = (
+        'status',
+    )
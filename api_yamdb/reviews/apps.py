@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_title_fts(sender, using, **kwargs):
+    from .fts import ensure_title_fts
+    ensure_title_fts(using)
 
 
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(restore_title_fts, sender=self)
@@ -22,6 +22,56 @@ MIN_SCORE = 1
 # Максимальная возможная оценка произведения:
 MAX_SCORE = 10
 
+# Максимальное количество произведений в одном запросе массового создания:
+MAX_BULK_TITLES = 5000
+
+# Разрезы таблицы лучших произведений:
+RANKING_ALL = 'all'
+RANKING_CATEGORY = 'category'
+RANKING_GENRE = 'genre'
+
+RANKING_SCOPE_CHOICES = (
+    (RANKING_ALL, 'Все произведения'),
+    (RANKING_CATEGORY, 'Категория'),
+    (RANKING_GENRE, 'Жанр'),
+)
+
+# Размер таблицы лучших произведений по умолчанию и максимальный:
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+# Минимальное количество отзывов для попадания в таблицу лучших:
+LEADERBOARD_MIN_REVIEWS = 1
+
+# Состояния писем в очереди на отправку:
+EMAIL_PENDING = 'pending'
+EMAIL_SENT = 'sent'
+EMAIL_FAILED = 'failed'
+
+EMAIL_STATUS_CHOICES = (
+    (EMAIL_PENDING, 'Ожидает отправки'),
+    (EMAIL_SENT, 'Отправлено'),
+    (EMAIL_FAILED, 'Не отправлено'),
+)
+
+# Количество писем, которые обработчик очереди забирает за один раз:
+EMAIL_BATCH_SIZE = 100
+
+# Количество попыток отправки письма до отказа:
+EMAIL_MAX_ATTEMPTS = 5
+
+# Задержка перед повторной попыткой и её предел, секунды:
+EMAIL_RETRY_DELAY = 60
+EMAIL_MAX_RETRY_DELAY = 60 * 60
+
+# Время, на которое обработчик резервирует взятые письма, секунды:
+EMAIL_LEASE_TIME = 60 * 5
+
+# Длина контрольной суммы файла (sha256) и отпечатка строки (blake2b)
+# при инкрементальной загрузке csv, в шестнадцатеричной записи:
+IMPORT_CHECKSUM_LENGTH = 64
+IMPORT_FINGERPRINT_LENGTH = 32
+
 # Роли пользователей:
 USER = 'user'
 ADMIN = 'admin'
@@ -0,0 +1,111 @@
+import csv
+import hashlib
+import json
+
+import django
+from django.apps import apps
+from django.core.exceptions import ValidationError
+
+from .constants import IMPORT_FINGERPRINT_LENGTH
+
+# Поля, которые являются внешними ключами
+FOREIGN_KEY_FIELDS = ('author', 'category')
+
+# Размер блока при подсчёте контрольной суммы файла, байты
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def init_worker():
+    """Готовит процесс пула, запущенный без fork, к работе с моделями."""
+    django.setup()
+
+
+def prepare_row(row):
+    for field in FOREIGN_KEY_FIELDS:
+        if field in row:
+            row[f'{field}_id'] = row.pop(field)
+    return row
+
+
+def read_chunk(path, offset, chunk_size):
+    """
+    Читает до chunk_size строк csv-файла с позиции offset.
+
+    Выполняется в процессе пула. Возвращает строки в виде словарей
+    и позицию следующей части или None, если файл прочитан до конца.
+    csv.reader забирает из файла ровно те строки, из которых состоит
+    запись, поэтому позиция после записи не разрывает многострочные
+    значения.
+    """
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        header = next(csv.reader([csv_file.readline()]))
+        if offset:
+            csv_file.seek(offset)
+        rows = []
+        for values in csv.reader(iter(csv_file.readline, '')):
+            if values:
+                rows.append(prepare_row(dict(zip(header, values))))
+            if len(rows) == chunk_size:
+                return rows, csv_file.tell()
+        return rows, None
+
+
+def validate_row(model, row):
+    """
+    Проверяет значения строки валидаторами полей модели.
+
+    Возвращает ошибки по именам полей. Для внешних ключей проверяется
+    только формат id: существование связанных строк и уникальность
+    требуют запросов к БД и проверяются при записи.
+    """
+    errors = {}
+    for field in model._meta.concrete_fields:
+        if field.attname not in row:
+            continue
+        value = row[field.attname]
+        try:
+            if field.is_relation:
+                field.target_field.to_python(value)
+            else:
+                field.clean(value, None)
+        except ValidationError as error:
+            errors[field.name] = error.messages
+    return errors
+
+
+def read_valid_chunk(path, offset, chunk_size, label):
+    """
+    Читает часть csv-файла и проверяет строки по полям модели label.
+
+    Выполняется в процессе пула, поэтому проверка распределяется по
+    ядрам вместе с чтением. Возвращает прошедшие проверку строки,
+    отклонённые строки с их номером в части и ошибками и позицию
+    следующей части.
+    """
+    model = apps.get_model(label)
+    rows, offset = read_chunk(path, offset, chunk_size)
+    valid, rejects = [], []
+    for index, row in enumerate(rows):
+        errors = validate_row(model, row)
+        if errors:
+            rejects.append({'index': index, 'errors': errors, 'row': row})
+        else:
+            valid.append(row)
+    return valid, rejects, offset
+
+
+def file_checksum(path):
+    """Sha256 содержимого файла; выполняется в процессе пула."""
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as csv_file:
+        for block in iter(lambda: csv_file.read(CHECKSUM_BLOCK_SIZE), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def row_fingerprint(row):
+    """Отпечаток значений строки, не зависящий от порядка колонок."""
+    data = json.dumps(row, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(
+        data.encode(), digest_size=IMPORT_FINGERPRINT_LENGTH // 2
+    ).hexdigest()
@@ -0,0 +1,90 @@
+"""
+Полнотекстовый индекс FTS5 по названию и описанию произведений.
+
+Индекс хранится во внешней таблице SQLite и поддерживается триггерами
+на reviews_title. SQLite пересоздаёт таблицу при части изменений схемы
+и теряет при этом триггеры, поэтому после каждой миграции они
+восстанавливаются, а индекс перестраивается. Пока миграция с индексом
+не применена (например, после отката на более раннюю), восстанавливать
+нечего.
+"""
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+TITLE_FTS_TABLE = 'reviews_title_fts'
+
+# Миграция, которая создаёт индекс
+TITLE_FTS_MIGRATION = ('reviews', '0004_title_fts')
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_FTS_TABLE} USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+TRIGGERS = {
+    f'{TITLE_FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {TITLE_FTS_TABLE}_ai AFTER INSERT ON reviews_title
+        BEGIN
+            INSERT INTO {TITLE_FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    f'{TITLE_FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {TITLE_FTS_TABLE}_ad AFTER DELETE ON reviews_title
+        BEGIN
+            INSERT INTO {TITLE_FTS_TABLE}(
+                {TITLE_FTS_TABLE}, rowid, name, description
+            )
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    f'{TITLE_FTS_TABLE}_au': f"""
+        CREATE TRIGGER {TITLE_FTS_TABLE}_au
+        AFTER UPDATE OF name, description ON reviews_title
+        BEGIN
+            INSERT INTO {TITLE_FTS_TABLE}(
+                {TITLE_FTS_TABLE}, rowid, name, description
+            )
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {TITLE_FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def ensure_title_fts(using='default'):
+    """Создаёт недостающие таблицу и триггеры индекса и перестраивает его."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    applied = MigrationRecorder(connection).applied_migrations()
+    if TITLE_FTS_MIGRATION not in applied:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name IN ('reviews_title', %s)",
+            (TITLE_FTS_TABLE,)
+        )
+        tables = {name for name, in cursor.fetchall()}
+        if 'reviews_title' not in tables:
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'reviews_title'"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        if TITLE_FTS_TABLE in tables and not missing:
+            return
+        cursor.execute(CREATE_TABLE)
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        cursor.execute(
+            f"INSERT INTO {TITLE_FTS_TABLE}({TITLE_FTS_TABLE}) "
+            "VALUES ('rebuild')"
+        )
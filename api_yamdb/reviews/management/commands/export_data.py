@@ -0,0 +1,134 @@
+import csv
+import gzip
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews import models
+from reviews.management.commands.import_data import (GENRE_TITLE,
+                                                     MODEL_AND_CSV_MATCHING)
+
+# Путь до директории для выгрузки
+EXPORT_DIR_PATH = 'export/'
+
+# Количество строк, которые забираются из БД за один раз
+CHUNK_SIZE = 2000
+
+# Колонки csv-файлов в том же виде, в каком их читает import_data.
+# Описания произведений нет в исходных данных, но import_data его
+# принимает, поэтому оно выгружается последней колонкой.
+CSV_COLUMNS = {
+    models.User: (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    ),
+    models.Genre: ('id', 'name', 'slug'),
+    models.Category: ('id', 'name', 'slug'),
+    models.Title: ('id', 'name', 'year', 'category', 'description'),
+    GENRE_TITLE: ('id', 'title_id', 'genre_id'),
+    models.Review: ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    models.Comment: ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+encoder = DjangoJSONEncoder()
+
+
+def to_csv(value):
+    """Значение поля в том виде, в каком оно записывается в csv."""
+    if value is None:
+        return ''
+    if isinstance(value, (str, int)):
+        return value
+    return encoder.default(value)
+
+
+def export_csv(path, columns, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        count = 0
+        for row in rows:
+            writer.writerow([to_csv(value) for value in row])
+            count += 1
+    return count
+
+
+def export_ndjson(path, columns, rows):
+    with gzip.open(path, 'wt', encoding='utf-8') as ndjson_file:
+        count = 0
+        for row in rows:
+            ndjson_file.write(json.dumps(
+                dict(zip(columns, row)), cls=DjangoJSONEncoder,
+                ensure_ascii=False
+            ) + '\n')
+            count += 1
+    return count
+
+
+def csv_columns(model):
+    return CSV_COLUMNS[model]
+
+
+def ndjson_columns(model):
+    """Все хранимые поля модели, внешние ключи — по имени колонки."""
+    return tuple(field.attname for field in model._meta.concrete_fields)
+
+
+# Форматы выгрузки: функция записи, расширение вместо .csv и колонки.
+# csv повторяет формат import_data, ndjson — полная копия таблиц.
+FORMATS = {
+    'csv': (export_csv, '.csv', csv_columns),
+    'ndjson': (export_ndjson, '.ndjson.gz', ndjson_columns),
+}
+
+
+class Command(BaseCommand):
+    """Пользовательская команда Django для выгрузки данных из БД."""
+
+    help = 'Export data from the database into csv or gzipped ndjson files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=EXPORT_DIR_PATH,
+            help='Directory for exported files'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, default='csv',
+            help='csv in the import_data layout or gzipped ndjson'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Number of rows fetched from the database at once'
+        )
+
+    def handle(self, *args, **kwargs):
+        export, extension, get_columns = FORMATS[kwargs['format']]
+        os.makedirs(kwargs['dir'], exist_ok=True)
+        for model, name in MODEL_AND_CSV_MATCHING.items():
+            columns = get_columns(model)
+            path = os.path.join(
+                kwargs['dir'], os.path.splitext(name)[0] + extension
+            )
+            # Строки читаются частями без создания объектов моделей,
+            # поэтому память не растёт с размером таблицы. Файл
+            # пишется во временный и подменяет прежнюю выгрузку
+            # только целиком.
+            rows = model.objects.order_by('pk').values_list(
+                *columns
+            ).iterator(chunk_size=kwargs['chunk_size'])
+            temporary_path = f'{path}.tmp'
+            try:
+                count = export(temporary_path, columns, rows)
+            except BaseException:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+                raise
+            os.replace(temporary_path, path)
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported {count} rows of model {model.__name__} '
+                f'to file: {path}'
+            ))
+        self.stdout.write(
+            self.style.SUCCESS('<===SUCCESSFULLY EXPORTED DATA===>')
+        )
@@ -1,15 +1,50 @@
+import json
 import os
-import csv
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
 
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 
+from api.cache import (CATALOG_VERSION_KEY, bump_version,
+                       get_comments_version_key, get_reviews_version_key)
 from reviews import models
+from reviews.csv_import import (file_checksum, init_worker,
+                                read_valid_chunk, row_fingerprint)
 
 # Путь до директории с csv-файлами
 CSV_DIR_PATH = 'static/data/'
 
-# Поля, которые являются внешними ключами
-FOREIGN_KEY_FIELDS = ('author', 'category')
+# Файл для строк, не прошедших проверку, по одному JSON на строку
+REJECTS_PATH = 'import_rejects.ndjson'
+
+# Количество строк в одной транзакции
+CHUNK_SIZE = 10000
+
+# Количество строк в одном INSERT
+BATCH_SIZE = 1000
+
+# Сколько прочитанных, но не записанных частей файла держать в памяти
+PREFETCH_CHUNKS = 2
+
+# Как часто выводить скорость загрузки, секунды
+PROGRESS_INTERVAL = 1
+
+# Настройки соединения SQLite на время загрузки с --fast;
+# cache_size задаётся в КиБ со знаком минус
+FAST_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'cache_size': -256 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Промежуточная модель связи произведений и жанров
+GENRE_TITLE = models.Title.genre.through
 
 # Словарь соответствий модели и csv-файла
 MODEL_AND_CSV_MATCHING = {
@@ -17,46 +52,176 @@ MODEL_AND_CSV_MATCHING = {
     models.Genre: 'genre.csv',
     models.Category: 'category.csv',
     models.Title: 'titles.csv',
+    GENRE_TITLE: 'genre_title.csv',
     models.Review: 'review.csv',
     models.Comment: 'comments.csv',
 }
 
+# Модели, строки которых входят в ответы каталога (/titles/ и т.п.)
+CATALOG_MODELS = (
+    models.Category, models.Genre, models.Title, GENRE_TITLE, models.Review,
+)
+
+# Ключи версий ответов API, которые сбрасываются после загрузки:
+# поле записанных строк и функция, строящая ключ по его значению
+RESOURCE_VERSION_KEYS = {
+    models.Review: ('title_id', get_reviews_version_key),
+    models.Comment: ('review_id', get_comments_version_key),
+}
+
+# Внешние ключи, существование которых проверяется перед вставкой;
+# строки с неизвестными id пропускаются
+CHECKED_RELATIONS = {
+    GENRE_TITLE: ('title', 'genre'),
+}
+
+
+def get_dependencies(model):
+    """Модели из MODEL_AND_CSV_MATCHING, на которые ссылается model."""
+    return {
+        field.related_model for field in model._meta.concrete_fields
+        if field.is_relation
+        and field.related_model in MODEL_AND_CSV_MATCHING
+        and field.related_model is not model
+    }
+
+
+class InlineExecutor:
+    """Исполнитель без пула: задача выполняется сразу при постановке."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+class FastLoad:
+    """
+    Профиль быстрой загрузки в SQLite.
+
+    На время загрузки отключает синхронизацию с диском, держит журнал
+    в памяти и увеличивает кэш страниц. Вторичные индексы таблиц
+    удаляются и строятся заново одним проходом, когда таблица
+    загружена; уникальные индексы остаются, на них держатся проверки
+    конфликтов. Если процесс упадёт посреди загрузки, база может
+    остаться повреждённой, поэтому режим предназначен для наполнения
+    базы, которую при сбое не жалко загрузить заново.
+    """
+
+    def __init__(self, connection, tables):
+        self.connection = connection
+        self.tables = tables
+        self.pragmas = {}
+        self.indexes = {}
+
+    def __enter__(self):
+        with self.connection.cursor() as cursor:
+            for name, value in FAST_LOAD_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {name}')
+                self.pragmas[name] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {name} = {value}')
+            for table in self.tables:
+                cursor.execute(
+                    "SELECT name, sql FROM sqlite_master "
+                    "WHERE type = 'index' AND tbl_name = %s "
+                    "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%'",
+                    (table,)
+                )
+                self.indexes[table] = cursor.fetchall()
+                for name, _ in self.indexes[table]:
+                    cursor.execute(
+                        f'DROP INDEX {self.connection.ops.quote_name(name)}'
+                    )
+        return self
+
+    def __exit__(self, *args):
+        for table in list(self.indexes):
+            self.restore_indexes(table)
+        with self.connection.cursor() as cursor:
+            for name, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+    def restore_indexes(self, table):
+        """Строит заново удалённые индексы загруженной таблицы."""
+        with self.connection.cursor() as cursor:
+            for _, sql in self.indexes.pop(table, ()):
+                cursor.execute(sql)
+
 
 class Command(BaseCommand):
     """Пользовательская команда Django для импорта данных из CSV в БД."""
 
     help = 'Load data from csv file into the database'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=CSV_DIR_PATH,
+            help='Directory with csv files'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Number of rows committed in one transaction'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Number of rows inserted by one query'
+        )
+        parser.add_argument(
+            '--jobs', type=int,
+            default=min(len(MODEL_AND_CSV_MATCHING), os.cpu_count() or 1),
+            help='Number of processes parsing csv files'
+        )
+        parser.add_argument(
+            '--rejects', default=REJECTS_PATH,
+            help='File for rows that failed validation'
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Skip unchanged files and rows, update changed rows'
+        )
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Relax SQLite durability and build secondary indexes '
+                 'after the load'
+        )
+
     def handle(self, *args, **kwargs):
-        error_occurred = False
-        for model in MODEL_AND_CSV_MATCHING:
-            csv_file_path = os.path.join(
-                CSV_DIR_PATH, MODEL_AND_CSV_MATCHING[model]
-            )
-            self.stdout.write(
-                self.style.WARNING(
-                    f'Starting to process file: {csv_file_path}')
+        files = {
+            model: os.path.join(kwargs['dir'], name)
+            for model, name in MODEL_AND_CSV_MATCHING.items()
+        }
+        fast_load = None
+        if kwargs['fast']:
+            if connection.vendor == 'sqlite':
+                fast_load = FastLoad(connection, [
+                    model._meta.db_table for model in files
+                ])
+            else:
+                self.stdout.write(self.style.WARNING(
+                    '--fast is only supported on SQLite, ignoring'
+                ))
+        if kwargs['jobs'] > 1:
+            executor = ProcessPoolExecutor(
+                kwargs['jobs'], initializer=init_worker
             )
-            try:
-                with open(
-                    csv_file_path, newline='', encoding='utf-8'
-                ) as csv_file:
-                    self.stdout.write(
-                        self.style.WARNING(f'Opened file: {csv_file_path}')
-                    )
-                    csv_serializer(csv.DictReader(csv_file), model, self)
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Finished processing file: {csv_file_path}'
-                        )
-                    )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Error processing file {csv_file_path}: {e}'
-                    )
-                )
-                error_occurred = True
+        else:
+            executor = InlineExecutor()
+        started = time.monotonic()
+        with executor, fast_load or nullcontext():
+            error_occurred = ImportScheduler(
+                self, files, kwargs['chunk_size'], kwargs['batch_size'],
+                kwargs['rejects'], kwargs['incremental'], fast_load
+            ).run(executor)
+        self.stdout.write(f'Elapsed: {time.monotonic() - started:.1f} s')
 
         if not error_occurred:
             self.stdout.write(
@@ -68,17 +233,440 @@ class Command(BaseCommand):
             )
 
 
-def csv_serializer(csv_data, model, command):
-    objs = []
-    for row_number, row in enumerate(csv_data, start=1):
-        for field in FOREIGN_KEY_FIELDS:
-            if field in row:
-                row[f'{field}_id'] = row[field]
-                del row[field]
-        objs.append(model(**row))
-    model.objects.bulk_create(objs, ignore_conflicts=True)
-    command.stdout.write(
-        command.style.SUCCESS(
-            f'Successfully bulk created objects for model {model.__name__}'
+class FileImport:
+    """Состояние загрузки одного csv-файла."""
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.dependencies = get_dependencies(model)
+        self.offset = 0
+        self.reading = None
+        self.checking = None
+        self.checksum = None
+        self.record = None
+        self.unchanged = False
+        self.chunks = deque()
+        self.read_rows = 0
+        self.total = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.unchanged_rows = 0
+        self.title_ids = set()
+        self.version_keys = set()
+        self.finished = False
+        self.failed = False
+        self.started = None
+        self.reported = 0
+        self.last_report = 0
+
+    @property
+    def drained(self):
+        return (
+            self.offset is None and self.reading is None and not self.chunks
         )
+
+
+class ImportScheduler:
+    """
+    Планировщик загрузки файлов с учётом зависимостей моделей.
+
+    Зависимости берутся из внешних ключей моделей. Файлы читаются
+    параллельно в процессах пула, каждый — частями по порядку и не
+    больше чем на PREFETCH_CHUNKS частей вперёд. Запись выполняется
+    в текущем процессе: часть файла записывается, как только
+    полностью загружены все модели, на которые он ссылается,
+    поэтому ждут только действительно зависимые записи.
+
+    Вместе с чтением в пуле строки проверяются валидаторами полей
+    модели. Записываются только прошедшие проверку строки, остальные
+    с ошибками по полям сохраняются в файл отклонённых строк.
+
+    В инкрементальном режиме сначала в пуле считается контрольная
+    сумма файла: файл, не изменившийся с прошлой загрузки, не
+    читается. В изменившемся файле записываются только строки,
+    отпечаток которых отличается от сохранённого, причём уже
+    существующие строки обновляются, а не пропускаются.
+    """
+
+    def __init__(self, command, files, chunk_size, batch_size,
+                 rejects_path=REJECTS_PATH, incremental=False,
+                 fast_load=None):
+        self.command = command
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.rejects_path = rejects_path
+        self.rejects_file = None
+        self.incremental = incremental
+        self.fast_load = fast_load
+        self.imports = [
+            FileImport(model, path) for model, path in files.items()
+        ]
+        self.by_model = {item.model: item for item in self.imports}
+
+    def run(self, executor):
+        """Загружает все файлы; возвращает True, если были ошибки."""
+        # Отклонённые строки прошлой загрузки не должны выдавать себя
+        # за результат этой.
+        if os.path.isfile(self.rejects_path):
+            os.remove(self.rejects_path)
+        try:
+            return self.run_imports(executor)
+        finally:
+            if self.rejects_file is not None:
+                self.rejects_file.close()
+
+    def run_imports(self, executor):
+        self.executor = executor
+        for item in self.imports:
+            self.write_message(
+                self.command.style.WARNING,
+                f'Starting to process file: {item.path}'
+            )
+            if self.incremental:
+                item.checking = executor.submit(file_checksum, item.path)
+            else:
+                self.schedule_read(item)
+        while True:
+            for item in self.imports:
+                self.collect(item)
+            if all(item.finished for item in self.imports):
+                break
+            item = self.next_writable()
+            if item is not None:
+                self.write(item, item.chunks.popleft())
+                self.schedule_read(item)
+                continue
+            pending = [
+                future for item in self.imports
+                for future in (item.reading, item.checking) if future
+            ]
+            if not pending:
+                raise RuntimeError('Circular dependency between csv files')
+            wait(pending, return_when=FIRST_COMPLETED)
+        return any(item.failed for item in self.imports)
+
+    def write_message(self, style, message):
+        self.command.stdout.write(style(message))
+
+    def schedule_read(self, item):
+        if (
+            item.reading is None
+            and item.offset is not None
+            and not item.failed
+            and len(item.chunks) < PREFETCH_CHUNKS
+        ):
+            item.reading = self.executor.submit(
+                read_valid_chunk, item.path, item.offset, self.chunk_size,
+                item.model._meta.label
+            )
+
+    def collect(self, item):
+        """Забирает прочитанную часть файла и ставит чтение следующей."""
+        if item.checking is not None and item.checking.done():
+            future, item.checking = item.checking, None
+            try:
+                item.checksum = future.result()
+            except Exception as error:
+                self.fail(item, error)
+                return
+            self.check_file(item)
+        if item.reading is not None and item.reading.done():
+            future, item.reading = item.reading, None
+            if item.failed:
+                return
+            try:
+                rows, rejects, item.offset = future.result()
+            except Exception as error:
+                self.fail(item, error)
+                return
+            self.reject(item, rejects)
+            item.read_rows += len(rows) + len(rejects)
+            if rows:
+                item.chunks.append(rows)
+            self.schedule_read(item)
+        self.finish(item)
+
+    def reject(self, item, rejects):
+        """Сохраняет отклонённые строки очередной части файла."""
+        if not rejects:
+            return
+        if self.rejects_file is None:
+            self.rejects_file = open(
+                self.rejects_path, 'w', encoding='utf-8'
+            )
+        for reject in rejects:
+            self.rejects_file.write(json.dumps({
+                'file': os.path.basename(item.path),
+                'row': item.read_rows + reject['index'] + 1,
+                'id': reject['row'].get('id'),
+                'errors': reject['errors'],
+                'values': reject['row'],
+            }, ensure_ascii=False) + '\n')
+        item.rejected += len(rejects)
+
+    def check_file(self, item):
+        """Пропускает файл с той же контрольной суммой, что в прошлый раз."""
+        item.record, _ = models.ImportedFile.objects.get_or_create(
+            name=os.path.basename(item.path)
+        )
+        if item.record.checksum == item.checksum:
+            item.unchanged = True
+            item.offset = None
+        else:
+            self.schedule_read(item)
+
+    def dependencies_ready(self, item):
+        return all(
+            self.by_model[model].finished for model in item.dependencies
+        )
+
+    def next_writable(self):
+        for item in self.imports:
+            if item.chunks and self.dependencies_ready(item):
+                return item
+        return None
+
+    def write(self, item, rows):
+        model = item.model
+        if item.started is None:
+            item.started = item.last_report = time.monotonic()
+        item.total += len(rows)
+        if self.incremental:
+            fingerprints, known = self.changed_rows(item, rows)
+            rows = [row for row in rows if row['id'] in fingerprints]
+        objs = [model(**row) for row in rows]
+        if model in CHECKED_RELATIONS:
+            valid = filter_missing_relations(
+                model, objs, CHECKED_RELATIONS[model]
+            )
+            item.skipped += len(objs) - len(valid)
+            objs = valid
+        try:
+            with transaction.atomic():
+                if self.incremental:
+                    written = {obj.pk: fingerprints[obj.pk] for obj in objs}
+                    upsert(
+                        model, objs, rows[0] if rows else (), self.batch_size
+                    )
+                    save_fingerprints(
+                        item.record, written, known, self.batch_size
+                    )
+                else:
+                    model.objects.bulk_create(
+                        objs, batch_size=self.batch_size,
+                        ignore_conflicts=True
+                    )
+        except Exception as error:
+            self.fail(item, error)
+            return
+        if model is models.Title:
+            item.title_ids.update(
+                model._meta.pk.to_python(obj.pk) for obj in objs
+            )
+        if model in RESOURCE_VERSION_KEYS:
+            field, get_key = RESOURCE_VERSION_KEYS[model]
+            to_python = model._meta.get_field(field).to_python
+            item.version_keys.update(
+                get_key(to_python(getattr(obj, field))) for obj in objs
+            )
+        if time.monotonic() - item.last_report >= PROGRESS_INTERVAL:
+            report_progress(self.command, item)
+        self.finish(item)
+
+    def changed_rows(self, item, rows):
+        """
+        Отпечатки строк, изменившихся с прошлой загрузки.
+
+        Возвращает отпечатки новых и изменившихся строк по их id
+        и id тех из них, что уже встречались в файле.
+        """
+        fingerprints = {row['id']: row_fingerprint(row) for row in rows}
+        known = dict(item.record.rows.filter(
+            row_id__in=fingerprints
+        ).values_list('row_id', 'fingerprint'))
+        for row_id, fingerprint in known.items():
+            if fingerprints[row_id] == fingerprint:
+                del fingerprints[row_id]
+        item.unchanged_rows += len(rows) - len(fingerprints)
+        return fingerprints, set(known)
+
+    def fail(self, item, error):
+        item.failed = item.finished = True
+        item.offset = None
+        item.chunks.clear()
+        self.write_message(
+            self.command.style.ERROR,
+            f'Error processing file {item.path}: {error}'
+        )
+
+    def finish(self, item):
+        if (
+            item.finished
+            or not item.drained
+            or not self.dependencies_ready(item)
+        ):
+            return
+        item.finished = True
+        if self.fast_load is not None:
+            # Индексы нужны пересчёту рейтингов после загрузки таблицы.
+            self.fast_load.restore_indexes(item.model._meta.db_table)
+        if item.unchanged:
+            self.write_message(
+                self.command.style.SUCCESS,
+                f'Skipped unchanged file: {item.path}'
+            )
+            return
+        if item.reported != item.total or not item.total:
+            report_progress(self.command, item)
+        if item.rejected:
+            self.write_message(
+                self.command.style.WARNING,
+                f'Rejected {item.rejected} invalid rows, '
+                f'see {self.rejects_path}'
+            )
+        if item.skipped:
+            self.write_message(
+                self.command.style.WARNING,
+                f'Skipped {item.skipped} rows with unknown related ids'
+            )
+        if item.unchanged_rows:
+            self.write_message(
+                self.command.style.WARNING,
+                f'Skipped {item.unchanged_rows} unchanged rows'
+            )
+        if item.record is not None:
+            item.record.checksum = item.checksum
+            item.record.save(update_fields=('checksum', 'imported_at'))
+        after_import(
+            item.model, item.title_ids, item.version_keys, self.batch_size
+        )
+        self.write_message(
+            self.command.style.SUCCESS,
+            'Successfully bulk created objects for model '
+            f'{item.model.__name__}'
+        )
+        self.write_message(
+            self.command.style.SUCCESS,
+            f'Finished processing file: {item.path}'
+        )
+
+
+def filter_missing_relations(model, objs, fields):
+    """
+    Отбрасывает объекты со ссылками на несуществующие строки.
+
+    Для каждого внешнего ключа выполняется один запрос на всю часть
+    файла, а не по запросу на строку.
+    """
+    for field in fields:
+        foreign_key = model._meta.get_field(field)
+        target = foreign_key.target_field
+        checked = []
+        for obj in objs:
+            try:
+                value = target.to_python(getattr(obj, foreign_key.attname))
+            except ValidationError:
+                continue
+            setattr(obj, foreign_key.attname, value)
+            checked.append(obj)
+        existing = set(
+            foreign_key.related_model.objects.filter(pk__in={
+                getattr(obj, foreign_key.attname) for obj in checked
+            }).values_list('pk', flat=True)
+        )
+        objs = [
+            obj for obj in checked
+            if getattr(obj, foreign_key.attname) in existing
+        ]
+    return objs
+
+
+def upsert(model, objs, columns, batch_size):
+    """
+    Вставляет новые объекты и обновляет существующие по первичному ключу.
+
+    Django 3.2 не умеет INSERT ... ON CONFLICT DO UPDATE, поэтому
+    существующие ключи выбираются одним запросом на часть файла,
+    новые объекты вставляются bulk_create, а существующие обновляются
+    bulk_update. Обновляются только колонки из csv: остальные поля,
+    например рейтинг произведения, сохраняют свои значения.
+    Возвращает количество обновлённых объектов.
+    """
+    if not objs:
+        return 0
+    pk = model._meta.pk
+    for obj in objs:
+        obj.pk = pk.to_python(obj.pk)
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objs]
+    ).values_list('pk', flat=True))
+    model.objects.bulk_create(
+        [obj for obj in objs if obj.pk not in existing],
+        batch_size=batch_size
+    )
+    fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.attname in columns
+    ]
+    changed = [obj for obj in objs if obj.pk in existing]
+    if changed and fields:
+        model.objects.bulk_update(changed, fields, batch_size=batch_size)
+    return len(changed)
+
+
+def save_fingerprints(record, fingerprints, known, batch_size):
+    """Сохраняет отпечатки записанных строк файла."""
+    record.rows.filter(row_id__in=known & fingerprints.keys()).delete()
+    models.ImportedRow.objects.bulk_create(
+        [
+            models.ImportedRow(
+                file=record, row_id=row_id, fingerprint=fingerprint
+            )
+            for row_id, fingerprint in fingerprints.items()
+        ],
+        batch_size=batch_size
+    )
+
+
+def after_import(model, title_ids=(), version_keys=(),
+                 batch_size=BATCH_SIZE):
+    """
+    Обновляет данные, которые bulk_create обходит без сигналов.
+
+    title_ids — записанные произведения: их разрезы таблицы лучших
+    пересоздаются, чтобы новые произведения попали в неё, а
+    обновлённые сменили категорию.
+    В конце увеличиваются версии ответов API, чтобы условные
+    GET-запросы и кэш списков не отдавали данные, построенные
+    до загрузки.
+    """
+    if model in (models.Category, models.Genre):
+        models.TableVersion.objects.bump(model._meta.label_lower)
+    if model is models.Review:
+        models.Title.objects.recalculate_rating()
+    if model in (models.Review, GENRE_TITLE):
+        models.TitleRanking.objects.rebuild()
+    title_ids = list(title_ids)
+    for start in range(0, len(title_ids), batch_size):
+        models.TitleRanking.objects.rebuild(
+            title_ids[start:start + batch_size]
+        )
+    version_keys = list(version_keys)
+    if model in CATALOG_MODELS:
+        version_keys.append(CATALOG_VERSION_KEY)
+    # Частями, чтобы не упереться в число параметров запроса.
+    for start in range(0, len(version_keys), batch_size):
+        bump_version(*version_keys[start:start + batch_size])
+
+
+def report_progress(command, item):
+    """Выводит скорость записи с начала записи файла."""
+    now = time.monotonic()
+    elapsed = now - item.started if item.started is not None else 0
+    rate = item.total / elapsed if elapsed else item.total
+    command.stdout.write(
+        f'{item.model.__name__}: {item.total} rows, {rate:.0f} rows/s'
     )
+    item.reported = item.total
+    item.last_report = now
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.email_func import send_outbox
+from reviews.constants import EMAIL_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Пользовательская команда Django для отправки писем из очереди."""
+
+    help = 'Send queued emails in batches over a single connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=EMAIL_BATCH_SIZE,
+            help='Number of emails claimed from the queue at once'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep polling the queue every INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_outbox(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Sent: {sent}, failed: {failed}')
+                )
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
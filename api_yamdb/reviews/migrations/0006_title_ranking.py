@@ -0,0 +1,55 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_ranking(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleRanking = apps.get_model('reviews', 'TitleRanking')
+    rows = []
+    for title in Title.objects.prefetch_related('genre'):
+        scopes = [('all', 0), ('category', title.category_id)]
+        scopes += [('genre', genre.pk) for genre in title.genre.all()]
+        rows.extend(
+            TitleRanking(
+                scope=scope, scope_id=scope_id, title=title,
+                rating=title.rating, review_count=title.review_count
+            )
+            for scope, scope_id in scopes
+        )
+    TitleRanking.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'Все произведения'), ('category', 'Категория'), ('genre', 'Жанр')], max_length=8, verbose_name='Разрез')),
+                ('scope_id', models.PositiveBigIntegerField(default=0, verbose_name='Id категории или жанра')),
+                ('rating', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Рейтинг')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Таблица лучших произведений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['scope', 'scope_id', '-rating', '-review_count'], name='ranking_scope_rating_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleranking',
+            constraint=models.UniqueConstraint(fields=('scope', 'scope_id', 'title'), name='unique_scope_title'),
+        ),
+        migrations.RunPython(fill_ranking, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True, verbose_name='Файл')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='Контрольная сумма')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Загружен')),
+            ],
+            options={
+                'verbose_name': 'Загруженный файл',
+                'verbose_name_plural': 'Загруженные файлы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_id', models.CharField(max_length=50, verbose_name='Id строки')),
+                ('fingerprint', models.CharField(max_length=32, verbose_name='Отпечаток')),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='reviews.importedfile', verbose_name='Файл')),
+            ],
+            options={
+                'verbose_name': 'Загруженная строка',
+                'verbose_name_plural': 'Загруженные строки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedrow',
+            constraint=models.UniqueConstraint(fields=('file', 'row_id'), name='unique_file_row_id'),
+        ),
+    ]
@@ -1,13 +1,29 @@
+import re
+import time
+from collections import defaultdict
+from datetime import timedelta
+
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 from django.core.validators import (MaxValueValidator, MinValueValidator)
-from django.db import models
-
-from .constants import (ADMIN, CHAR_OUTPUT_LIMIT, EMAIL_LENGTH,
-                        MAX_NAME_LENGTH, MAX_SCORE, MAX_SLUG_LENGTH, MIN_SCORE,
-                        MIN_YEAR, MODERATOR, ROLE_CHOICES, USER,
+from django.db import connections, models, transaction
+from django.db.models import (Case, Count, F, OuterRef, Q, Subquery, Sum,
+                              When)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
+
+from .constants import (ADMIN, CHAR_OUTPUT_LIMIT, EMAIL_FAILED,
+                        EMAIL_LEASE_TIME, EMAIL_LENGTH, EMAIL_MAX_ATTEMPTS,
+                        EMAIL_MAX_RETRY_DELAY, EMAIL_PENDING,
+                        EMAIL_RETRY_DELAY, EMAIL_SENT, EMAIL_STATUS_CHOICES,
+                        IMPORT_CHECKSUM_LENGTH, IMPORT_FINGERPRINT_LENGTH,
+                        LEADERBOARD_MIN_REVIEWS, MAX_NAME_LENGTH, MAX_SCORE,
+                        MAX_SLUG_LENGTH, MIN_SCORE, MIN_YEAR, MODERATOR,
+                        RANKING_ALL, RANKING_CATEGORY, RANKING_GENRE,
+                        RANKING_SCOPE_CHOICES, ROLE_CHOICES, USER,
                         USERNAME_LENGTH)
+from .fts import TITLE_FTS_TABLE
 from .validators import username_validator
 
 
@@ -60,6 +76,263 @@ class User(AbstractUser):
         return self.username
 
 
+class TableVersionQuerySet(models.QuerySet):
+    """QuerySet версий таблиц."""
+
+    def get_version(self, name):
+        """Текущая версия таблицы или 0, если она ещё не менялась."""
+        return self.filter(name=name).values_list(
+            'version', flat=True
+        ).first() or 0
+
+    def bump(self, *names):
+        """
+        Увеличивает версии таблиц.
+
+        Новая версия не меньше текущего времени в наносекундах,
+        поэтому не повторяет прежние значения даже после очистки
+        таблицы версий. Любое число версий обновляется не больше
+        чем тремя запросами.
+        """
+        names = set(names)
+        now = time.time_ns()
+        updated = self.filter(name__in=names).update(
+            version=Greatest(F('version') + 1, now)
+        )
+        if updated < len(names):
+            names -= set(
+                self.filter(name__in=names).values_list('name', flat=True)
+            )
+            self.bulk_create(
+                [self.model(name=name, version=now) for name in names],
+                ignore_conflicts=True
+            )
+
+
+class TableVersion(models.Model):
+    """
+    Версия содержимого таблицы или ресурса API.
+
+    Увеличивается при изменении строк редко меняющихся таблиц и при
+    изменении ресурсов API, чтобы процессы могли сверять с ней свои
+    локальные кэши и условные ответы.
+    """
+
+    name = models.CharField(
+        max_length=MAX_SLUG_LENGTH,
+        unique=True,
+        verbose_name='Таблица'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+
+    objects = TableVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    """QuerySet очереди исходящих писем."""
+
+    def enqueue(self, subject, body, recipient, from_email):
+        return self.create(
+            subject=subject,
+            body=body,
+            recipient=recipient,
+            from_email=from_email
+        )
+
+    def due(self, now=None):
+        """Письма, которые пора отправить, в порядке очереди."""
+        return self.filter(
+            status=EMAIL_PENDING,
+            next_attempt_at__lte=now or timezone.now()
+        ).order_by('next_attempt_at', 'id')
+
+    def claim(self, batch_size):
+        """
+        Резервирует за обработчиком очередную пачку писем.
+
+        Срок следующей попытки у взятых писем переносится на время
+        аренды: другие обработчики их не увидят, а если процесс
+        упадёт, письма вернутся в очередь по истечении аренды.
+        """
+        now = timezone.now()
+        ids = list(self.due(now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        lease = now + timedelta(seconds=EMAIL_LEASE_TIME)
+        self.filter(pk__in=ids, next_attempt_at__lte=now).update(
+            next_attempt_at=lease
+        )
+        return list(self.filter(
+            pk__in=ids, status=EMAIL_PENDING, next_attempt_at=lease
+        ).order_by('id'))
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди на отправку.
+
+    Запросы только ставят письма в очередь, отправляет их команда
+    send_emails: пачками, через одно соединение с почтовым сервером
+    и с повторными попытками при ошибках.
+    """
+
+    subject = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        verbose_name='Тема'
+    )
+    body = models.TextField(
+        verbose_name='Текст'
+    )
+    from_email = models.EmailField(
+        max_length=EMAIL_LENGTH,
+        verbose_name='Отправитель'
+    )
+    recipient = models.EmailField(
+        max_length=EMAIL_LENGTH,
+        verbose_name='Получатель'
+    )
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in EMAIL_STATUS_CHOICES),
+        choices=EMAIL_STATUS_CHOICES,
+        default=EMAIL_PENDING,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток отправки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлено в очередь'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправлено'
+    )
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='email_status_next_attempt_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject[:CHAR_OUTPUT_LIMIT]}'
+
+    def mark_sent(self):
+        self.status = EMAIL_SENT
+        self.attempts += 1
+        self.last_error = ''
+        self.sent_at = timezone.now()
+
+    def mark_failed(self, error):
+        """
+        Учитывает неудачную попытку.
+
+        Следующая попытка откладывается с удвоением задержки, после
+        EMAIL_MAX_ATTEMPTS попыток письмо получает статус failed.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= EMAIL_MAX_ATTEMPTS:
+            self.status = EMAIL_FAILED
+            return
+        delay = min(
+            EMAIL_RETRY_DELAY * 2 ** (self.attempts - 1),
+            EMAIL_MAX_RETRY_DELAY
+        )
+        self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+
+class ImportedFile(models.Model):
+    """
+    Csv-файл, загруженный командой import_data --incremental.
+
+    Контрольная сумма сохраняется после успешной загрузки всего файла;
+    файл с той же суммой при следующей загрузке пропускается.
+    """
+
+    name = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        unique=True,
+        verbose_name='Файл'
+    )
+    checksum = models.CharField(
+        max_length=IMPORT_CHECKSUM_LENGTH,
+        blank=True,
+        verbose_name='Контрольная сумма'
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Загружен'
+    )
+
+    class Meta:
+        verbose_name = 'Загруженный файл'
+        verbose_name_plural = 'Загруженные файлы'
+
+    def __str__(self):
+        return self.name
+
+
+class ImportedRow(models.Model):
+    """Отпечаток строки csv-файла из последней загрузки."""
+
+    file = models.ForeignKey(
+        ImportedFile,
+        on_delete=models.CASCADE,
+        related_name='rows',
+        verbose_name='Файл'
+    )
+    row_id = models.CharField(
+        max_length=MAX_SLUG_LENGTH,
+        verbose_name='Id строки'
+    )
+    fingerprint = models.CharField(
+        max_length=IMPORT_FINGERPRINT_LENGTH,
+        verbose_name='Отпечаток'
+    )
+
+    class Meta:
+        verbose_name = 'Загруженная строка'
+        verbose_name_plural = 'Загруженные строки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['file', 'row_id'],
+                name='unique_file_row_id'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.file_id}: {self.row_id}'
+
+
 class NameSlugModel(models.Model):
     """Абстрактная модель для категории и жанра."""
 
@@ -99,6 +372,108 @@ class Genre(NameSlugModel):
         verbose_name_plural = 'Жанры'
 
 
+# Возможные оценки произведения:
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
+
+
+def score_count_field(score):
+    """Имя поля Title со счётчиком отзывов с данной оценкой."""
+    return f'score_{score}_count'
+
+
+class TitleQuerySet(models.QuerySet):
+    """QuerySet произведений."""
+
+    def search(self, query):
+        """
+        Полнотекстовый поиск по названию и описанию.
+
+        На SQLite использует индекс FTS5 и сортирует результаты
+        по релевантности (bm25), на других СУБД ищет вхождения слов.
+        """
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return self.none()
+        if connections[self.db].vendor != 'sqlite':
+            condition = Q()
+            for term in terms:
+                condition &= (
+                    Q(name__icontains=term) | Q(description__icontains=term)
+                )
+            return self.filter(condition)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return self.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TITLE_FTS_TABLE} '
+            f'WHERE {TITLE_FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT bm25({TITLE_FTS_TABLE}) FROM {TITLE_FTS_TABLE} '
+            f'WHERE {TITLE_FTS_TABLE} MATCH %s '
+            f'AND rowid = {self.model._meta.db_table}.id',
+            (match,)
+        )).order_by('search_rank', 'id')
+
+    def update_scores(self, new_score=None, old_score=None):
+        """
+        Учитывает изменение оценки отзыва одним UPDATE.
+
+        new_score — оценка созданного или изменённого отзыва,
+        old_score — прежняя оценка изменённого или удалённого отзыва.
+        Меняются сумма оценок, количество отзывов, гистограмма
+        и пересчитывается рейтинг.
+        """
+        score_delta = (new_score or 0) - (old_score or 0)
+        count_delta = (new_score is not None) - (old_score is not None)
+        changes = {
+            'score_sum': F('score_sum') + score_delta,
+            'review_count': F('review_count') + count_delta,
+            'rating': Case(
+                When(review_count=-count_delta, then=None),
+                default=(
+                    (F('score_sum') + score_delta)
+                    / (F('review_count') + count_delta)
+                ),
+            ),
+        }
+        if new_score != old_score:
+            if new_score is not None:
+                field = score_count_field(new_score)
+                changes[field] = F(field) + 1
+            if old_score is not None:
+                field = score_count_field(old_score)
+                changes[field] = F(field) - 1
+        updated = self.update(**changes)
+        TitleRanking.objects.filter(title__in=self.values('pk')).refresh()
+        return updated
+
+    def recalculate_rating(self):
+        """Полностью пересчитывает сохранённый рейтинг по отзывам."""
+        reviews = Review.objects.filter(title=OuterRef('pk')).order_by()
+
+        def count(queryset, aggregate):
+            return Coalesce(Subquery(
+                queryset.values('title').annotate(total=aggregate)
+                .values('total')
+            ), 0)
+
+        self.update(
+            score_sum=count(reviews, Sum('score')),
+            review_count=count(reviews, Count('id')),
+            **{
+                score_count_field(score): count(
+                    reviews.filter(score=score), Count('id')
+                )
+                for score in SCORES
+            }
+        )
+        return self.update(
+            rating=Case(
+                When(review_count=0, then=None),
+                default=F('score_sum') / F('review_count'),
+            )
+        )
+
+
 class Title(models.Model):
     """Модель произведения."""
 
@@ -130,15 +505,165 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория произведения'
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+    rating = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        default=None,
+        verbose_name='Рейтинг'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name[:CHAR_OUTPUT_LIMIT]
 
+    @property
+    def score_histogram(self):
+        """Количество отзывов по каждой оценке."""
+        return {
+            score: getattr(self, score_count_field(score))
+            for score in SCORES
+        }
+
+
+# Гистограмма оценок: по счётчику на каждую возможную оценку.
+for score in SCORES:
+    Title.add_to_class(
+        score_count_field(score),
+        models.PositiveIntegerField(
+            default=0,
+            verbose_name=f'Количество оценок {score}'
+        )
+    )
+
+
+class TitleRankingQuerySet(models.QuerySet):
+    """QuerySet таблицы лучших произведений."""
+
+    def refresh(self):
+        """Переносит в строки рейтинг и число отзывов из произведений."""
+        titles = Title.objects.filter(pk=OuterRef('title_id'))
+        return self.update(
+            rating=Subquery(titles.values('rating')[:1]),
+            review_count=Subquery(titles.values('review_count')[:1]),
+        )
+
+    def rebuild(self, title_ids=None):
+        """
+        Пересоздаёт строки таблицы для произведений.
+
+        Для каждого произведения создаются строки общего разреза,
+        разреза его категории и разрезов каждого его жанра.
+        Без title_ids таблица перестраивается целиком.
+        """
+        titles = Title.objects.order_by()
+        links = Title.genre.through.objects.order_by()
+        stale = self.all()
+        if title_ids is not None:
+            titles = titles.filter(pk__in=title_ids)
+            links = links.filter(title_id__in=title_ids)
+            stale = stale.filter(title_id__in=title_ids)
+        genres = defaultdict(list)
+        for title_id, genre_id in links.values_list('title_id', 'genre_id'):
+            genres[title_id].append(genre_id)
+        rows = []
+        for title_id, category_id, rating, review_count in (
+            titles.values_list('id', 'category_id', 'rating', 'review_count')
+        ):
+            scopes = [(RANKING_ALL, 0), (RANKING_CATEGORY, category_id)]
+            scopes += [(RANKING_GENRE, genre) for genre in genres[title_id]]
+            rows.extend(
+                self.model(
+                    scope=scope, scope_id=scope_id, title_id=title_id,
+                    rating=rating, review_count=review_count
+                )
+                for scope, scope_id in scopes
+            )
+        with transaction.atomic(using=self.db):
+            stale.delete()
+            self.bulk_create(rows, batch_size=1000)
+
+    def leaderboard(self, scope=RANKING_ALL, scope_id=0,
+                    min_reviews=LEADERBOARD_MIN_REVIEWS):
+        """Лучшие произведения разреза по убыванию рейтинга."""
+        return self.filter(
+            scope=scope,
+            scope_id=scope_id,
+            review_count__gte=max(min_reviews, 1),
+        ).order_by('-rating', '-review_count', 'title_id')
+
+
+class TitleRanking(models.Model):
+    """
+    Предрасчитанная таблица лучших произведений.
+
+    Хранит копию рейтинга произведения в каждом разрезе (все,
+    категория, жанр), чтобы выборка лучших была чтением диапазона
+    индекса. Рейтинг обновляется вместе с оценками отзывов.
+    """
+
+    scope = models.CharField(
+        max_length=max(len(scope) for scope, _ in RANKING_SCOPE_CHOICES),
+        choices=RANKING_SCOPE_CHOICES,
+        verbose_name='Разрез'
+    )
+    scope_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Id категории или жанра'
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='rankings',
+        verbose_name='Произведение'
+    )
+    rating = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Рейтинг'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+
+    objects = TitleRankingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Таблица лучших произведений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'scope_id', 'title'],
+                name='unique_scope_title'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['scope', 'scope_id', '-rating', '-review_count'],
+                name='ranking_scope_rating_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.scope_id}: {self.title_id}'
+
 
 class TextAuthorPubDateModel(models.Model):
     """Базовый класс моделей отзыва и комментария."""
@@ -188,8 +713,21 @@ class Review(TextAuthorPubDateModel):
                 name='unique_author_title'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            ),
+        ]
         default_related_name = 'reviews'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженную оценку, чтобы учесть её изменение."""
+        review = super().from_db(db, field_names, values)
+        review.saved_score = review.__dict__.get('score')
+        return review
+
 
 class Comment(TextAuthorPubDateModel):
     """Модель комментария."""
@@ -203,4 +741,10 @@ class Comment(TextAuthorPubDateModel):
     class Meta(TextAuthorPubDateModel.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
         default_related_name = 'comments'
@@ -0,0 +1,45 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .constants import RANKING_GENRE
+from .models import Category, Genre, TableVersion, Title, TitleRanking
+
+
+@receiver(post_save, sender=Title)
+def rebuild_title_ranking(sender, instance, raw=False, **kwargs):
+    """Обновляет разрезы таблицы лучших после сохранения произведения."""
+    if not raw:
+        TitleRanking.objects.rebuild([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def rebuild_genre_ranking(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Обновляет жанровые разрезы при изменении жанров произведения."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        TitleRanking.objects.rebuild([instance.pk])
+    elif action == 'post_clear':
+        TitleRanking.objects.filter(
+            scope=RANKING_GENRE, scope_id=instance.pk
+        ).delete()
+    else:
+        TitleRanking.objects.rebuild(pk_set)
+
+
+@receiver(post_delete, sender=Genre)
+def delete_genre_ranking(sender, instance, **kwargs):
+    """Удаляет разрез удалённого жанра."""
+    TitleRanking.objects.filter(
+        scope=RANKING_GENRE, scope_id=instance.pk
+    ).delete()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_table_version(sender, **kwargs):
+    """Увеличивает версию таблицы категорий или жанров."""
+    TableVersion.objects.bump(sender._meta.label_lower)
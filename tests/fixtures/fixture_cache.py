@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def throttle_file(settings, tmp_path):
+    # Свежие счётчики ограничения частоты для каждого теста.
+    settings.THROTTLE_FILE = str(tmp_path / 'throttle')
+    return settings.THROTTLE_FILE
@@ -0,0 +1,131 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title, TitleRanking
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAPI:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_review_changes(self, client, admin_client,
+                                              user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(admin_client, title_id, 'text', 8)
+        review_id = create_single_review(
+            user_client, title_id, 'text', 3
+        ).json()['id']
+        create_single_review(moderator_client, title_id, 'text', 7)
+        assert self.get_rating(client, title_id) == 6, (
+            'Проверьте, что рейтинг произведения равен средней оценке '
+            'после создания отзывов.'
+        )
+
+        response = user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            data={'score': 9}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(client, title_id) == 8, (
+            'Проверьте, что рейтинг произведения пересчитывается '
+            'при изменении оценки в отзыве.'
+        )
+
+        response = user_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(client, title_id) == 7, (
+            'Проверьте, что рейтинг произведения пересчитывается '
+            'при удалении отзыва.'
+        )
+        assert self.get_rating(client, titles[1]['id']) is None, (
+            'Проверьте, что у произведения без отзывов рейтинг равен `None`.'
+        )
+
+    def test_02_score_histogram(self, client, admin_client, user_client,
+                                moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        assert 'score_histogram' not in client.get(url).json(), (
+            'Проверьте, что гистограмма оценок выводится только '
+            'по запросу.'
+        )
+
+        create_single_review(admin_client, title_id, 'text', 8)
+        review_id = create_single_review(
+            user_client, title_id, 'text', 8
+        ).json()['id']
+        create_single_review(moderator_client, title_id, 'text', 2)
+        user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            data={'score': 10}
+        )
+        histogram = client.get(url, data={'histogram': 1}).json().get(
+            'score_histogram'
+        )
+        expected = {str(score): 0 for score in range(1, 11)}
+        expected.update({'2': 1, '8': 1, '10': 1})
+        assert histogram == expected, (
+            'Проверьте, что гистограмма оценок учитывает создание и '
+            'изменение отзывов.'
+        )
+
+        user_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            )
+        )
+        histogram = client.get(url, data={'histogram': 1}).json().get(
+            'score_histogram'
+        )
+        assert histogram['10'] == 0, (
+            'Проверьте, что гистограмма оценок учитывает удаление отзывов.'
+        )
+
+    def test_03_rating_follows_author_deletion(self, client, admin_client,
+                                               user, user_client,
+                                               moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        for title in titles[:2]:
+            create_single_review(user_client, title['id'], 'text', 2)
+            create_single_review(moderator_client, title['id'], 'text', 8)
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        for title in titles[:2]:
+            assert self.get_rating(client, title['id']) == 8, (
+                'Проверьте, что рейтинг произведения пересчитывается '
+                'при удалении автора отзыва.'
+            )
+            stored = Title.objects.get(pk=title['id'])
+            assert (
+                stored.review_count, stored.score_sum, stored.score_2_count
+            ) == (1, 8, 0)
+            assert set(TitleRanking.objects.filter(
+                title_id=title['id']
+            ).values_list('review_count', flat=True)) == {1}, (
+                'Проверьте, что таблица лучших учитывает удаление '
+                'автора отзыва.'
+            )
@@ -0,0 +1,118 @@
+import json
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Category, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPaginationAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def walk(self, client, url, direction='next'):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что GET-запрос к `{url}` в режиме курсоров '
+                'возвращает ответ со статусом 200.'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в режиме курсоров ответ не содержит '
+                'ключ `count`.'
+            )
+            pages.append(data)
+            url = data[direction]
+        return pages
+
+    def test_01_titles_cursor_pages(self, client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        for idx in range(25):
+            Title.objects.create(
+                name=f'Произведение {idx % 7}', year=2000,
+                category=category
+            )
+        expected = list(
+            Title.objects.order_by('name', 'id').values_list('id', flat=True)
+        )
+
+        pages = self.walk(client, f'{self.TITLES_URL}?pagination=cursor')
+        ids = [item['id'] for page in pages for item in page['results']]
+        assert ids == expected, (
+            'Проверьте, что в режиме курсоров страницы произведений '
+            'идут по порядку без пропусков и повторов.'
+        )
+        assert [len(page['results']) for page in pages] == [10, 10, 5]
+
+        back = self.walk(client, pages[-1]['previous'], 'previous')
+        back_ids = [
+            item['id'] for page in reversed(back) for item in page['results']
+        ]
+        assert back_ids == expected[:20], (
+            'Проверьте, что ссылка `previous` в режиме курсоров '
+            'возвращает предыдущие страницы.'
+        )
+
+    def test_02_reviews_cursor_pages(self, client, django_user_model):
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Фильм', year=2000,
+                                     category=category)
+        reviews = [
+            Review.objects.create(
+                title=title, text=str(idx), score=5,
+                author=django_user_model.objects.create_user(
+                    username=f'user{idx}', email=f'user{idx}@yamdb.fake'
+                )
+            )
+            for idx in range(12)
+        ]
+        Review.objects.filter(
+            pk__in=[review.pk for review in reviews]
+        ).update(pub_date=reviews[0].pub_date)
+
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        pages = self.walk(client, f'{url}?pagination=cursor')
+        ids = [item['id'] for page in pages for item in page['results']]
+        assert ids == sorted((review.id for review in reviews), reverse=True)
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что некорректный курсор приводит к ответу '
+            'со статусом 404.'
+        )
+
+    def test_03_malformed_cursor_position(self, client, django_user_model):
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Фильм', year=2000,
+                                     category=category)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        for url, position in (
+            (reviews_url, ['abc', 1]),
+            (reviews_url, [None, 1]),
+            (self.TITLES_URL, ['x', 'abc']),
+            (self.TITLES_URL, ['x', [1]]),
+        ):
+            cursor = urlsafe_b64encode(
+                json.dumps({'p': position, 'r': 0}).encode()
+            ).decode()
+            response = client.get(f'{url}?cursor={cursor}')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что курсор с некорректными значениями позиции '
+                'приводит к ответу со статусом 404.'
+            )
+
+    def test_04_ordering_rejected_in_cursor_mode(self, client):
+        response = client.get(
+            f'{self.TITLES_URL}?pagination=cursor&ordering=year'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что параметр `ordering` в режиме курсоров '
+            'приводит к ответу со статусом 400.'
+        )
+        response = client.get(f'{self.TITLES_URL}?ordering=year')
+        assert response.status_code == HTTPStatus.OK
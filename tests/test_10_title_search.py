@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitleSearchAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, data=query)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` возвращает ответ со статусом 200.'
+        )
+        return [title['id'] for title in response.json()['results']]
+
+    def test_01_search_by_name_and_description(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+
+        assert self.search(client, {'search': 'термин'}) == [
+            titles[0]['id']
+        ], (
+            'Проверьте, что параметр `search` находит произведения '
+            'по началу слова в названии.'
+        )
+        assert self.search(client, {'search': 'yippie'}) == [
+            titles[1]['id']
+        ], (
+            'Проверьте, что параметр `search` ищет по описанию произведения.'
+        )
+        assert self.search(
+            client, {'search': 'термин', 'genre': genres[2]['slug']}
+        ) == [], (
+            'Проверьте, что параметр `search` сочетается с фильтрами.'
+        )
+        assert self.search(client, {'search': '"('}) == []
+
+    def test_02_search_index_follows_changes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        response = admin_client.patch(url, data={'name': 'Чужой'})
+        assert response.status_code == HTTPStatus.OK
+        assert self.search(client, {'search': 'терминатор'}) == []
+        assert self.search(client, {'search': 'чужой'}) == [titles[0]['id']], (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+
+        response = admin_client.delete(url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.search(client, {'search': 'чужой'}) == [], (
+            'Проверьте, что поисковый индекс обновляется при удалении '
+            'произведения.'
+        )
+
+    def test_03_index_follows_migrations(self):
+        def fts_table_exists():
+            tables = connection.introspection.table_names()
+            return 'reviews_title_fts' in tables
+
+        call_command('migrate', 'reviews', '0003', verbosity=0)
+        try:
+            assert not fts_table_exists(), (
+                'Проверьте, что после отката миграций до `0003` поисковый '
+                'индекс не восстанавливается.'
+            )
+        finally:
+            call_command('migrate', verbosity=0)
+        assert fts_table_exists(), (
+            'Проверьте, что повторное применение миграций создаёт '
+            'поисковый индекс.'
+        )
@@ -0,0 +1,81 @@
+import csv
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.cache import CATALOG_VERSION_KEY
+from reviews.models import Category, TableVersion, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleCacheAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_list_cached_until_catalog_changes(
+        self, client, admin_client, user_client, django_assert_num_queries
+    ):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(self.TITLES_URL, data={'ordering': 'year'})
+        assert response.status_code == HTTPStatus.OK
+
+        with django_assert_num_queries(1):
+            cached = client.get(self.TITLES_URL, data={'ordering': 'year'})
+        assert cached.json() == response.json(), (
+            'Проверьте, что повторный GET-запрос к '
+            f'`{self.TITLES_URL}` с теми же параметрами отдаётся из кэша.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'text', 7)
+        data = client.get(self.TITLES_URL, data={'ordering': 'year'}).json()
+        assert data['results'][0]['rating'] == 7, (
+            'Проверьте, что кэш списка произведений сбрасывается после '
+            'изменения рейтинга.'
+        )
+
+        Title.objects.filter(pk=titles[1]['id']).get().delete()
+        data = client.get(self.TITLES_URL, data={'ordering': 'year'}).json()
+        assert data['count'] == 1, (
+            'Проверьте, что кэш списка произведений сбрасывается после '
+            'удаления произведения.'
+        )
+
+    def test_02_list_invalidated_by_other_process(self, client,
+                                                  admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(self.TITLES_URL)
+        # Другой процесс меняет произведение: сигналы этого процесса
+        # не срабатывают, меняется только версия каталога в БД.
+        Title.objects.filter(pk=titles[0]['id']).update(name='Другое')
+        TableVersion.objects.bump(CATALOG_VERSION_KEY)
+        names = [
+            title['name']
+            for title in client.get(self.TITLES_URL).json()['results']
+        ]
+        assert 'Другое' in names, (
+            'Проверьте, что кэш списка произведений сбрасывается '
+            'изменением, сделанным в другом процессе.'
+        )
+
+    def test_03_list_invalidated_by_import(self, client, admin_client,
+                                           tmp_path):
+        create_titles(admin_client)
+        category = Category.objects.first()
+        count = client.get(self.TITLES_URL).json()['count']
+        with open(tmp_path / 'titles.csv', 'w', newline='',
+                  encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(('id', 'name', 'year', 'category'))
+            writer.writerow((998, 'Импортированное', 2000, category.pk))
+        call_command(
+            'import_data', '--dir', str(tmp_path), '--jobs', '1',
+            stdout=StringIO()
+        )
+        assert Title.objects.filter(pk=998).exists()
+        assert client.get(self.TITLES_URL).json()['count'] == count + 1, (
+            'Проверьте, что кэш списка произведений сбрасывается '
+            'после загрузки данных командой import_data.'
+        )
@@ -0,0 +1,136 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.cache import CATALOG_VERSION_KEY
+from reviews.models import TableVersion
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12ConditionalGetAPI:
+
+    URL_TEMPLATES = (
+        '/api/v1/titles/',
+        '/api/v1/titles/{title_id}/',
+        '/api/v1/genres/',
+        '/api/v1/categories/',
+        '/api/v1/titles/{title_id}/reviews/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+    )
+
+    def test_01_not_modified(self, client, admin_client, admin, user,
+                             user_client, django_assert_num_queries):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        for template in self.URL_TEMPLATES:
+            url = template.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            )
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response.has_header('ETag'), (
+                f'Проверьте, что ответ на GET-запрос к `{template}` '
+                'содержит заголовок `ETag`.'
+            )
+            assert response.has_header('Last-Modified')
+            # Вложенные маршруты дополнительно проверяют родителя.
+            queries = 2 if '/reviews/' in template else 1
+            with django_assert_num_queries(queries):
+                response = client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f'Проверьте, что GET-запрос к `{template}` с актуальным '
+                '`If-None-Match` возвращает ответ со статусом 304.'
+            )
+
+    def test_02_validators_change_on_write(self, client, admin_client, admin,
+                                           user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+            'comments/'
+        )
+        etag = client.get(url)['ETag']
+        response = user_client.patch(
+            f'{url}{comments[1]["id"]}/', data={'text': 'new text'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения комментария `ETag` списка '
+            'комментариев меняется.'
+        )
+
+    def test_03_versions_shared_between_processes(self, client, admin_client,
+                                                  admin, user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        etag = response['ETag']
+        # Изменение, сделанное другим процессом: локальный кэш этого
+        # процесса о нём не знает, видна только версия в БД.
+        TableVersion.objects.bump(CATALOG_VERSION_KEY)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что версии ресурсов общие для всех процессов: '
+            'после изменения в другом процессе `ETag` меняется.'
+        )
+        assert response['ETag'] != etag
+
+    def test_04_if_modified_since_alone_is_not_trusted(self, client,
+                                                       admin_client, admin,
+                                                       user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = '/api/v1/titles/'
+        last_modified = client.get(url)['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `If-Modified-Since` без `If-None-Match` '
+            'не приводит к ответу 304: Last-Modified не различает '
+            'изменения внутри одной секунды.'
+        )
+
+    def test_05_missing_parent_is_not_modified(self, client, admin_client,
+                                                admin, user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        etag = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')[
+            'ETag'
+        ]
+        response = client.get(
+            '/api/v1/titles/424242/reviews/', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что GET-запрос к отзывам несуществующего '
+            'произведения с `If-None-Match` возвращает ответ со статусом '
+            '404, а не 304.'
+        )
+
+        url_template = (
+            '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        )
+        etag = client.get(url_template.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        ))['ETag']
+        response = client.get(
+            url_template.format(
+                title_id=titles[1]['id'], review_id=reviews[0]['id']
+            ),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что GET-запрос к комментариям отзыва другого '
+            'произведения с `If-None-Match` возвращает ответ со статусом '
+            '404, а не 304.'
+        )
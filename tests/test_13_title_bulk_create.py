@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleBulkCreateAPI:
+
+    BULK_URL = '/api/v1/titles/bulk/'
+
+    def test_01_bulk_create(self, admin_client, user_client,
+                            django_assert_max_num_queries):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = [
+            {
+                'name': f'Произведение {idx}',
+                'year': 1950 + idx,
+                'genre': [genres[0]['slug'], genres[idx % 2 + 1]['slug']],
+                'category': categories[idx % 2]['slug'],
+            }
+            for idx in range(50)
+        ]
+        data.append({'name': 'Без категории', 'year': 2000,
+                     'genre': [genres[0]['slug']], 'category': 'unknown'})
+        data.append({'name': 'Без года', 'genre': [genres[0]['slug']],
+                     'category': categories[0]['slug']})
+
+        response = user_client.post(self.BULK_URL, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что POST-запрос пользователя к `{self.BULK_URL}` '
+            'возвращает ответ со статусом 403.'
+        )
+
+        with django_assert_max_num_queries(17):
+            response = admin_client.post(
+                self.BULK_URL, data=data, format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{self.BULK_URL}` '
+            'возвращает ответ со статусом 201.'
+        )
+        results = response.json()
+        assert len(results) == len(data)
+        assert 'category' in results[-2]['errors']
+        assert 'year' in results[-1]['errors']
+
+        titles = Title.objects.in_bulk([item['id'] for item in results[:-2]])
+        for item, result in zip(data, results):
+            if 'id' not in result:
+                continue
+            title = titles[result['id']]
+            assert title.name == item['name']
+            assert title.category.slug == item['category']
+            assert sorted(
+                title.genre.values_list('slug', flat=True)
+            ) == sorted(item['genre']), (
+                'Проверьте, что массово созданным произведениям '
+                'назначаются переданные жанры.'
+            )
+
+    def test_02_bulk_create_invalid_payload(self, admin_client):
+        response = admin_client.post(self.BULK_URL, data={}, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import TitleRanking
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14LeaderboardAPI:
+
+    LEADERBOARD_URL = '/api/v1/titles/leaderboard/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_ids(self, client, **params):
+        response = client.get(self.LEADERBOARD_URL, data=params)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.LEADERBOARD_URL}` '
+            'возвращает ответ со статусом 200.'
+        )
+        return [title['id'] for title in response.json()]
+
+    def test_01_leaderboard(self, client, admin_client, user_client,
+                            moderator_client):
+        titles, categories, genres = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        assert TitleRanking.objects.filter(title_id=first).count() == 4, (
+            'Проверьте, что для произведения создаются строки общего '
+            'разреза, разреза категории и разрезов жанров.'
+        )
+        assert self.get_ids(client) == [], (
+            'Проверьте, что произведения без отзывов не попадают '
+            'в таблицу лучших.'
+        )
+
+        create_single_review(admin_client, first, 'text', 6)
+        create_single_review(user_client, first, 'text', 6)
+        review_id = create_single_review(
+            moderator_client, second, 'text', 9
+        ).json()['id']
+        assert self.get_ids(client) == [second, first]
+        assert self.get_ids(client, min_reviews=2) == [first], (
+            'Проверьте, что параметр `min_reviews` отсекает произведения '
+            'с меньшим числом отзывов.'
+        )
+        assert self.get_ids(client, genre=genres[0]['slug']) == [first]
+        assert self.get_ids(
+            client, category=categories[1]['slug']
+        ) == [second]
+
+        moderator_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=second, review_id=review_id
+            ),
+            data={'score': 2}
+        )
+        assert self.get_ids(client) == [first, second], (
+            'Проверьте, что таблица лучших обновляется при изменении '
+            'оценки.'
+        )
+
+        response = client.get(
+            self.LEADERBOARD_URL,
+            data={'genre': genres[0]['slug'],
+                  'category': categories[0]['slug']}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.LEADERBOARD_URL, data={'genre': 'none'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
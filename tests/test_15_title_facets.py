@@ -0,0 +1,52 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15TitleFacetsAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_facets(self, client, **params):
+        response = client.get(self.TITLES_URL, data={'facets': 1, **params})
+        assert response.status_code == HTTPStatus.OK
+        facets = response.json().get('facets')
+        assert facets is not None, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`facets` возвращает ключ `facets`.'
+        )
+        return {
+            kind: {item['slug']: item['count'] for item in items}
+            for kind, items in facets.items()
+        }
+
+    def test_01_facets(self, client, admin_client,
+                       django_assert_max_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert 'facets' not in response.json()
+        list_queries = len(context)
+
+        expected = {
+            'genre': {'horror': 1, 'comedy': 1, 'drama': 1},
+            'category': {'films': 1, 'books': 1},
+        }
+        with django_assert_max_num_queries(list_queries + 3):
+            assert self.get_facets(client) == expected, (
+                'Проверьте, что без фильтров `facets` содержит количество '
+                'произведений по всем жанрам и категориям.'
+            )
+        with django_assert_max_num_queries(list_queries + 3):
+            facets = self.get_facets(client, category=categories[0]['slug'])
+        assert facets == {
+            'genre': {'horror': 1, 'comedy': 1},
+            'category': {'films': 1},
+        }, (
+            'Проверьте, что `facets` учитывает применённые фильтры.'
+        )
@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TitleMultiFilterAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_ids(self, client, query):
+        response = client.get(f'{self.TITLES_URL}?{query}')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}?{query}` '
+            'возвращает ответ со статусом 200.'
+        )
+        data = response.json()
+        ids = [title['id'] for title in data['results']]
+        assert len(ids) == len(set(ids)) == data['count'], (
+            'Проверьте, что фильтрация по нескольким жанрам не '
+            'дублирует произведения.'
+        )
+        return sorted(ids)
+
+    def test_01_genre_modes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        both = sorted(title['id'] for title in titles)
+        first = [titles[0]['id']]
+
+        assert self.get_ids(client, 'genre=horror') == first
+        assert self.get_ids(client, 'genre=horror,drama') == both, (
+            'Проверьте, что по умолчанию несколько жанров объединяются '
+            'через ИЛИ.'
+        )
+        assert self.get_ids(client, 'genre=horror&genre=drama') == both
+        assert self.get_ids(
+            client, 'genre=horror,comedy&genre_mode=or'
+        ) == first
+        assert self.get_ids(
+            client, 'genre=horror,comedy&genre_mode=and'
+        ) == first, (
+            'Проверьте, что в режиме `and` находятся произведения '
+            'со всеми указанными жанрами.'
+        )
+        assert self.get_ids(
+            client, 'genre=horror,drama&genre_mode=and'
+        ) == []
+
+        response = client.get(f'{self.TITLES_URL}?genre_mode=xor')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_02_category_modes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        both = sorted(title['id'] for title in titles)
+
+        assert self.get_ids(client, 'category=films,books') == both
+        assert self.get_ids(
+            client, 'category=films,books&category_mode=and'
+        ) == []
+        assert self.get_ids(
+            client, 'category=films&genre=comedy,drama'
+        ) == [titles[0]['id']]
@@ -0,0 +1,50 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, TableVersion
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17LookupCacheAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    CATEGORIES_URL = '/api/v1/categories/'
+
+    def test_01_title_list_uses_cached_lookups(self, client, admin_client):
+        create_titles(admin_client)
+        client.get(self.CATEGORIES_URL)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        lookup_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "reviews_category"' in query['sql']
+            or 'FROM "reviews_genre"' in query['sql']
+        ]
+        assert not lookup_queries, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` берёт '
+            'категории и жанры из кэша справочников.'
+        )
+        title = response.json()['results'][0]
+        assert title['category'] and title['genre']
+
+    def test_02_version_bump_from_other_worker(self, client, admin_client):
+        create_titles(admin_client)
+        client.get(self.CATEGORIES_URL)
+
+        # Изменение, сделанное другим процессом: строка и версия в БД.
+        Category.objects.filter(slug='films').update(name='Кино')
+        TableVersion.objects.bump(Category._meta.label_lower)
+
+        response = client.get(self.CATEGORIES_URL)
+        names = {item['slug']: item['name'] for item in response.json()[
+            'results'
+        ]}
+        assert names['films'] == 'Кино', (
+            'Проверьте, что кэш справочников перечитывается после '
+            'увеличения версии таблицы.'
+        )
@@ -0,0 +1,54 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18NestedResourcesAPI:
+
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_review_of_other_title(self, client, admin_client, admin,
+                                      user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[1]['id'], review_id=reviews[0]['id']
+        )
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что GET-запрос к комментариям отзыва, который не '
+            'относится к произведению из адреса, возвращает ответ со '
+            'статусом 404.'
+        )
+        response = user_client.post(url, data={'text': 'text'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = user_client.delete(f'{url}{comments[1]["id"]}/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_parents_loaded_once(self, admin_client, admin, user,
+                                    user_client, moderator_client,
+                                    django_assert_max_num_queries):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        create_single_review(moderator_client, titles[1]['id'], 'text', 5)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        with django_assert_max_num_queries(6) as context:
+            response = user_client.post(url, data={'text': 'text'})
+        assert response.status_code == HTTPStatus.CREATED
+        parent_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "reviews_review"' in query['sql']
+        ]
+        assert len(parent_queries) == 1, (
+            'Проверьте, что отзыв и произведение из адреса загружаются '
+            'одним запросом за запрос.'
+        )
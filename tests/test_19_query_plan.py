@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.query_plan import build_query_plan
+from api.serializers import ReviewSerializer, TitleSerializerForRead
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19QueryPlanAPI:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_plan_from_serializer_fields(self):
+        plan = build_query_plan(ReviewSerializer())
+        assert plan.select_related == ['author'], (
+            'Проверьте, что автор отзыва загружается через select_related.'
+        )
+        assert 'author__username' in plan.only
+        assert 'title' in plan.only
+
+        plan = build_query_plan(TitleSerializerForRead())
+        assert 'score_1_count' not in plan.only
+
+    def test_02_no_n_plus_one(self, client, admin_client, admin, user,
+                              user_client, moderator, moderator_client):
+        authors = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        comments, reviews, titles = create_comments(admin_client, authors)
+        urls = (
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+        )
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            user_queries = [
+                query for query in context.captured_queries
+                if query['sql'].startswith('SELECT')
+                and 'FROM "reviews_user"' in query['sql']
+            ]
+            assert not user_queries, (
+                f'Проверьте, что GET-запрос к `{url}` не загружает '
+                'авторов отдельными запросами.'
+            )
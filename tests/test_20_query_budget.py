@@ -0,0 +1,233 @@
+"""
+Бюджет SQL-запросов для эндпоинтов api/urls.py.
+
+Для каждого маршрута фиксируется допустимое число запросов.
+Для списков дополнительно проверяется, что число запросов не растёт
+вместе с количеством объектов на странице (нет N+1). При нарушении
+в сообщении выводятся «отпечатки» SQL — запросы без литералов —
+с количеством повторов.
+"""
+import re
+from collections import Counter
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import ClaimsRefreshToken
+from reviews.models import (
+    Category, Comment, Genre, Review, Title, TitleRanking, User
+)
+
+# Объектов на странице при проверке роста числа запросов:
+SMALL_PAGE = 2
+FULL_PAGE = 10
+
+# (имя, метод, шаблон адреса, клиент, данные, бюджет запросов)
+ENDPOINTS = (
+    ('titles-list', 'get', '/api/v1/titles/', 'anon', None, 8),
+    ('titles-detail', 'get', '/api/v1/titles/{title}/', 'anon', None, 7),
+    ('titles-leaderboard', 'get', '/api/v1/titles/leaderboard/', 'anon',
+     None, 7),
+    ('titles-create', 'post', '/api/v1/titles/', 'admin',
+     {'name': 'Новое', 'year': 2000, 'genre': ['genre-0'],
+      'category': 'category-0'}, 25),
+    ('titles-bulk', 'post', '/api/v1/titles/bulk/', 'admin',
+     [{'name': 'Новое', 'year': 2000, 'genre': ['genre-0'],
+       'category': 'category-0'}], 16),
+    ('titles-patch', 'patch', '/api/v1/titles/{title}/', 'admin',
+     {'name': 'Другое'}, 16),
+    ('titles-delete', 'delete', '/api/v1/titles/{title}/', 'admin',
+     None, 13),
+    ('genres-list', 'get', '/api/v1/genres/', 'anon', None, 3),
+    ('genres-create', 'post', '/api/v1/genres/', 'admin',
+     {'name': 'Новый', 'slug': 'new-genre'}, 5),
+    ('genres-delete', 'delete', '/api/v1/genres/genre-0/', 'admin',
+     None, 11),
+    ('categories-list', 'get', '/api/v1/categories/', 'anon', None, 3),
+    ('categories-create', 'post', '/api/v1/categories/', 'admin',
+     {'name': 'Новая', 'slug': 'new-category'}, 5),
+    ('categories-delete', 'delete', '/api/v1/categories/category-1/',
+     'admin', None, 16),
+    ('reviews-list', 'get', '/api/v1/titles/{title}/reviews/', 'anon',
+     None, 4),
+    ('reviews-detail', 'get', '/api/v1/titles/{title}/reviews/{review}/',
+     'anon', None, 3),
+    ('reviews-create', 'post', '/api/v1/titles/{title}/reviews/', 'new',
+     {'text': 'Отзыв', 'score': 7}, 8),
+    ('reviews-patch', 'patch', '/api/v1/titles/{title}/reviews/{review}/',
+     'author', {'score': 3}, 8),
+    ('reviews-delete', 'delete', '/api/v1/titles/{title}/reviews/{review}/',
+     'author', None, 10),
+    ('comments-list', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', 'anon', None, 4),
+    ('comments-detail', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', 'anon',
+     None, 3),
+    ('comments-create', 'post',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', 'new',
+     {'text': 'Комментарий'}, 4),
+    ('comments-patch', 'patch',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     'author', {'text': 'Другой'}, 5),
+    ('comments-delete', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     'author', None, 6),
+    ('users-list', 'get', '/api/v1/users/', 'admin', None, 2),
+    ('users-detail', 'get', '/api/v1/users/{username}/', 'admin', None, 1),
+    ('users-create', 'post', '/api/v1/users/', 'admin',
+     {'username': 'created', 'email': 'created@yamdb.fake'}, 4),
+    ('users-patch', 'patch', '/api/v1/users/{username}/', 'admin',
+     {'bio': 'Новое описание'}, 3),
+    ('users-delete', 'delete', '/api/v1/users/{username}/', 'admin',
+     None, 18),
+    ('users-me', 'get', '/api/v1/users/me/', 'author', None, 1),
+    ('users-me-patch', 'patch', '/api/v1/users/me/', 'author',
+     {'bio': 'Обо мне'}, 2),
+    ('auth-signup', 'post', '/api/v1/auth/signup/', 'anon',
+     {'username': 'signup', 'email': 'signup@yamdb.fake'}, 6),
+    ('auth-token', 'post', '/api/v1/auth/token/', 'anon',
+     lambda ids: {
+         'username': ids['author'].username,
+         'confirmation_code': default_token_generator.make_token(
+             ids['author']
+         ),
+     }, 2),
+    ('auth-token-refresh', 'post', '/api/v1/auth/token/refresh/', 'anon',
+     lambda ids: {
+         'refresh': str(ClaimsRefreshToken.for_user(ids['author'])),
+     }, 9),
+)
+
+LIST_ENDPOINTS = (
+    'titles-list', 'titles-leaderboard', 'genres-list', 'categories-list',
+    'reviews-list', 'comments-list', 'users-list',
+)
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SQL_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def fingerprint(sql):
+    """SQL-запрос без литералов: одинаковые запросы с разными id совпадут."""
+    return SQL_LISTS.sub('(...)', SQL_LITERALS.sub('?', sql))
+
+
+def describe(queries):
+    counts = Counter(fingerprint(query['sql']) for query in queries)
+    return '\n'.join(
+        f'{count} x {sql}' for sql, count in counts.most_common()
+    )
+
+
+def make_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.credentials(
+            HTTP_AUTHORIZATION='Bearer {}'.format(
+                ClaimsRefreshToken.for_user(user).access_token
+            )
+        )
+    return client
+
+
+def seed(size, start=0):
+    """Создаёт по size объектов каждого вида, начиная с номера start."""
+    author, _ = User.objects.get_or_create(
+        username='TestAuthor', email='testauthor@yamdb.fake'
+    )
+    for idx in range(start, start + size):
+        Category.objects.create(name=f'Категория {idx}',
+                                slug=f'category-{idx}')
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+    categories = list(Category.objects.order_by('id'))
+    genres = list(Genre.objects.order_by('id'))
+    for idx in range(start, start + size):
+        title = Title.objects.create(
+            name=f'Произведение {idx}', year=1900 + idx,
+            category=categories[idx]
+        )
+        title.genre.set(genres[:2])
+    first = Title.objects.order_by('id').first()
+    review, _ = Review.objects.get_or_create(
+        title=first, author=author, defaults={'text': 'Отзыв', 'score': 5}
+    )
+    comment, _ = Comment.objects.get_or_create(
+        review=review, author=author, defaults={'text': 'Текст'}
+    )
+    titles = Title.objects.order_by('id')[start:start + size]
+    for idx, title in enumerate(titles, start):
+        reader = User.objects.create(
+            username=f'reader{idx}', email=f'reader{idx}@yamdb.fake'
+        )
+        Review.objects.create(title=title, author=reader, text='Отзыв',
+                              score=idx % 10 + 1)
+        if title != first:
+            Review.objects.create(title=first, author=reader,
+                                  text='Отзыв', score=8)
+        Comment.objects.create(review=review, author=reader, text='Текст')
+    Title.objects.recalculate_rating()
+    TitleRanking.objects.rebuild()
+    return {
+        'title': first.pk,
+        'review': review.pk,
+        'comment': comment.pk,
+        'username': 'reader0',
+        'author': author,
+    }
+
+
+def run(endpoint, ids, admin):
+    name, method, template, client_name, data, budget = endpoint
+    clients = {
+        'anon': lambda: make_client(),
+        'admin': lambda: make_client(admin),
+        'author': lambda: make_client(ids['author']),
+        'new': lambda: make_client(User.objects.create(
+            username='newcomer', email='newcomer@yamdb.fake'
+        )),
+    }
+    client = clients[client_name]()
+    url = template.format(**ids)
+    if callable(data):
+        data = data(ids)
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data=data, format='json')
+    assert HTTPStatus.OK <= response.status_code < HTTPStatus.BAD_REQUEST, (
+        f'{name}: `{method.upper()} {url}` вернул статус '
+        f'{response.status_code}: {response.content[:200]}'
+    )
+    return response, context.captured_queries
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20QueryBudgetAPI:
+
+    @pytest.mark.parametrize(
+        'endpoint', ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS]
+    )
+    def test_01_endpoint_within_budget(self, endpoint, admin):
+        ids = seed(FULL_PAGE)
+        _, queries = run(endpoint, ids, admin)
+        name, method, template, _, _, budget = endpoint
+        assert len(queries) <= budget, (
+            f'{name}: `{method.upper()} {template}` выполнил '
+            f'{len(queries)} SQL-запросов при бюджете {budget}:\n'
+            f'{describe(queries)}'
+        )
+
+    @pytest.mark.parametrize('name', LIST_ENDPOINTS)
+    def test_02_list_queries_do_not_grow(self, name, admin):
+        endpoint = next(item for item in ENDPOINTS if item[0] == name)
+        ids = seed(SMALL_PAGE)
+        _, small = run(endpoint, ids, admin)
+        seed(FULL_PAGE - SMALL_PAGE, start=SMALL_PAGE)
+        _, full = run(endpoint, ids, admin)
+        assert len(full) <= len(small), (
+            f'{name}: число SQL-запросов выросло с {len(small)} до '
+            f'{len(full)} при увеличении страницы с {SMALL_PAGE} до '
+            f'{FULL_PAGE} объектов:\n{describe(full)}'
+        )
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from http import HTTPStatus
+from smtplib import SMTPServerDisconnected
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.email_func import send_outbox
+from reviews.constants import (EMAIL_FAILED, EMAIL_MAX_ATTEMPTS,
+                               EMAIL_PENDING, EMAIL_RETRY_DELAY, EMAIL_SENT)
+from reviews.models import OutgoingEmail
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый бэкенд, который не принимает письма на заданные адреса."""
+
+    def __init__(self, broken=(), **kwargs):
+        super().__init__(**kwargs)
+        self.broken = set(broken)
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.broken & set(message.to):
+                raise SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21EmailOutboxAPI:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def enqueue(self, count):
+        for idx in range(count):
+            OutgoingEmail.objects.enqueue(
+                'Тема', 'Текст', f'user{idx}@yamdb.fake', 'admin@yamdb.fake'
+            )
+
+    def test_01_signup_only_enqueues(self, client):
+        response = client.post(self.URL_SIGNUP, data={
+            'username': 'queued', 'email': 'queued@yamdb.fake'
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо сама, '
+            'а только ставит его в очередь.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == 'queued@yamdb.fake'
+        assert email.status == EMAIL_PENDING
+
+        call_command('send_emails')
+        assert [message.to for message in mail.outbox] == [
+            ['queued@yamdb.fake']
+        ], 'Проверьте, что команда send_emails отправляет письма из очереди.'
+        assert OutgoingEmail.objects.get().status == EMAIL_SENT
+
+        call_command('send_emails')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что отправленные письма не отправляются повторно.'
+        )
+
+    def test_02_batches_share_connection(self):
+        self.enqueue(7)
+        connection = FlakyBackend()
+        assert send_outbox(batch_size=3, connection=connection) == (7, 0)
+        assert len(mail.outbox) == 7
+        assert connection.opened == 1, (
+            'Проверьте, что все пачки писем отправляются через одно '
+            'соединение с почтовым сервером.'
+        )
+
+    def test_03_retry_with_backoff(self):
+        self.enqueue(3)
+        connection = FlakyBackend(broken={'user1@yamdb.fake'})
+        assert send_outbox(connection=connection) == (2, 1)
+        failed = OutgoingEmail.objects.get(recipient='user1@yamdb.fake')
+        assert failed.status == EMAIL_PENDING
+        assert failed.attempts == 1
+        assert 'Connection unexpectedly closed' in failed.last_error
+        delay = failed.next_attempt_at - timezone.now()
+        assert timedelta(0) < delay <= timedelta(seconds=EMAIL_RETRY_DELAY), (
+            'Проверьте, что после ошибки письмо откладывается на время '
+            'задержки перед повторной попыткой.'
+        )
+        assert send_outbox(connection=connection) == (0, 0), (
+            'Проверьте, что письмо не отправляется повторно до истечения '
+            'задержки.'
+        )
+
+        previous_delay = delay
+        for attempt in range(2, EMAIL_MAX_ATTEMPTS + 1):
+            OutgoingEmail.objects.filter(pk=failed.pk).update(
+                next_attempt_at=timezone.now()
+            )
+            assert send_outbox(connection=connection) == (0, 1)
+            failed.refresh_from_db()
+            assert failed.attempts == attempt
+            if attempt < EMAIL_MAX_ATTEMPTS:
+                delay = failed.next_attempt_at - timezone.now()
+                assert delay > previous_delay, (
+                    'Проверьте, что задержка растёт с каждой попыткой.'
+                )
+                previous_delay = delay
+        assert failed.status == EMAIL_FAILED, (
+            'Проверьте, что после исчерпания попыток письмо помечается '
+            'как неотправленное.'
+        )
+
+        connection.broken.clear()
+        OutgoingEmail.objects.filter(pk=failed.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        assert send_outbox(connection=connection) == (0, 0)
+        assert len(mail.outbox) == 2
@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import VerifiedTokenCache, verified_tokens
+from reviews.models import Category, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ClaimsAuthAPI:
+
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    def get_client(self, user):
+        response = APIClient().post(self.URL_TOKEN, data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+        assert response.status_code == HTTPStatus.OK
+        token = response.json()['token']
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client, token
+
+    def user_queries(self, queries):
+        return [
+            query['sql'] for query in queries
+            if 'FROM "reviews_user"' in query['sql']
+        ]
+
+    def test_01_token_contains_role(self, admin):
+        _, token = self.get_client(admin)
+        payload = AccessToken(token).payload
+        assert payload['role'] == admin.role, (
+            'Проверьте, что access-токен содержит роль пользователя.'
+        )
+        assert payload['is_staff'] is False
+        assert payload['username'] == admin.username
+
+    def test_02_reads_without_user_query(self, admin, user):
+        admin_client, _ = self.get_client(admin)
+        user_client, _ = self.get_client(user)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get('/api/v1/categories/')
+        assert response.status_code == HTTPStatus.OK
+        assert not self.user_queries(context.captured_queries), (
+            'Проверьте, что для чтения с токеном, содержащим роль, '
+            'пользователь не загружается из БД.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.OK
+        assert len(self.user_queries(context.captured_queries)) == 1, (
+            'Проверьте, что права администратора проверяются по токену.'
+        )
+        assert user_client.get(
+            '/api/v1/users/'
+        ).status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что по токену с ролью `user` список пользователей '
+            'недоступен.'
+        )
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['email'] == user.email, (
+            'Проверьте, что эндпоинт `/users/me/` возвращает данные '
+            'пользователя из БД.'
+        )
+
+    def test_03_writes_use_db_user(self, user):
+        client, _ = self.get_client(user)
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Фильм', year=2000,
+                                     category=category)
+        response = client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 5}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert Review.objects.get().author == user
+
+    def test_04_verified_tokens_are_cached(self, user, monkeypatch):
+        client, _ = self.get_client(user)
+        calls = []
+        verify = JWTAuthentication.get_validated_token
+
+        def counting_verify(self, raw_token):
+            calls.append(raw_token)
+            return verify(self, raw_token)
+
+        monkeypatch.setattr(
+            JWTAuthentication, 'get_validated_token', counting_verify
+        )
+        verified_tokens.clear()
+        for _ in range(3):
+            assert client.get('/api/v1/genres/').status_code == HTTPStatus.OK
+        assert len(calls) == 1, (
+            'Проверьте, что подпись токена проверяется один раз, а '
+            'повторные запросы берут токен из кэша.'
+        )
+
+    def test_05_token_cache_bounds(self):
+        cache = VerifiedTokenCache(2)
+        live = {'exp': 2 ** 40}
+        cache.add(b'first', live)
+        cache.add(b'second', live)
+        assert cache.get(b'first') is live
+        cache.add(b'third', live)
+        assert cache.get(b'second') is None, (
+            'Проверьте, что кэш токенов вытесняет давно не использованные.'
+        )
+        assert cache.get(b'first') is live
+        cache.add(b'expired', {'exp': 0})
+        assert cache.get(b'expired') is None, (
+            'Проверьте, что кэш не возвращает просроченные токены.'
+        )
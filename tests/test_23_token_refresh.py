@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23TokenRefreshAPI:
+
+    URL_TOKEN = '/api/v1/auth/token/'
+    URL_REFRESH = '/api/v1/auth/token/refresh/'
+
+    def obtain(self, client, user):
+        response = client.post(self.URL_TOKEN, data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+        assert response.status_code == HTTPStatus.OK
+        return response.json()
+
+    def test_01_obtain_returns_refresh(self, client, user):
+        with CaptureQueriesContext(connection) as context:
+            data = self.obtain(client, user)
+        assert 'token' in data and 'refresh' in data, (
+            f'Проверьте, что эндпоинт `{self.URL_TOKEN}` возвращает '
+            'access-токен в ключе `token` и refresh-токен в ключе `refresh`.'
+        )
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_user"')
+        ], (
+            'Проверьте, что при выдаче токена активному пользователю '
+            'его запись не перезаписывается.'
+        )
+
+    def test_02_refresh_rotates(self, client, user, django_user_model):
+        data = self.obtain(client, user)
+        response = client.post(self.URL_REFRESH, data={
+            'refresh': data['refresh']
+        })
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос к `{self.URL_REFRESH}` с '
+            'действующим refresh-токеном возвращает ответ со статусом 200.'
+        )
+        renewed = response.json()
+        assert renewed['refresh'] != data['refresh'], (
+            'Проверьте, что при обновлении выдаётся новый refresh-токен.'
+        )
+        assert AccessToken(renewed['token'])['user_id'] == user.id
+
+        response = client.post(self.URL_REFRESH, data={
+            'refresh': data['refresh']
+        })
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что использованный refresh-токен нельзя '
+            'использовать повторно.'
+        )
+
+        django_user_model.objects.filter(pk=user.pk).update(role='moderator')
+        response = client.post(self.URL_REFRESH, data={
+            'refresh': renewed['refresh']
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert AccessToken(response.json()['token'])['role'] == 'moderator', (
+            'Проверьте, что новые токены содержат актуальную роль '
+            'пользователя.'
+        )
+
+    def test_03_refresh_invalid_token(self, client, user):
+        access = self.obtain(client, user)['token']
+        for refresh in ('broken', access):
+            response = client.post(self.URL_REFRESH, data={
+                'refresh': refresh
+            })
+            assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+                'Проверьте, что некорректный refresh-токен отклоняется '
+                'со статусом 401.'
+            )
+        response = client.post(self.URL_REFRESH)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
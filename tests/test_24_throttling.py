@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+import stat
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.throttling import SharedWindowCounters
+from reviews.models import Category, Title
+
+WINDOW = 60
+START = 1000 * WINDOW
+
+
+def hit_in_child(path, count):
+    counters = SharedWindowCounters(path, 64)
+    for _ in range(count):
+        counters.hit('shared', 10, WINDOW, START)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24ThrottlingAPI:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    @pytest.fixture
+    def rates(self, settings):
+        def set_rates(**rates):
+            settings.REST_FRAMEWORK = {
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {
+                    **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                    **rates,
+                },
+            }
+        return set_rates
+
+    def test_01_signup_throttled_without_queries(self, client, rates):
+        rates(auth='2/minute')
+        for _ in range(2):
+            response = client.post(self.URL_SIGNUP)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.URL_SIGNUP, data={
+                'username': 'throttled', 'email': 'throttled@yamdb.fake'
+            })
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что частые запросы к `{self.URL_SIGNUP}` с одного '
+            'адреса отклоняются со статусом 429.'
+        )
+        assert 'Retry-After' in response
+        assert not context.captured_queries, (
+            'Проверьте, что отклонённый запрос не обращается к БД.'
+        )
+        response = client.post(
+            self.URL_SIGNUP, REMOTE_ADDR='10.0.0.2'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что лимит считается отдельно для каждого адреса.'
+        )
+
+    def test_02_token_throttled_by_username(self, client, user, rates):
+        rates(auth_username='2/minute')
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        for idx in range(2):
+            response = client.post(
+                self.URL_TOKEN, data=data, REMOTE_ADDR=f'10.0.0.{idx}'
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        data['confirmation_code'] = default_token_generator.make_token(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                self.URL_TOKEN, data=data, REMOTE_ADDR='10.0.0.9'
+            )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что попытки получить токен для одного пользователя '
+            'ограничены независимо от адреса клиента.'
+        )
+        assert not context.captured_queries
+
+    def test_03_review_create_throttled_per_user(self, user_client,
+                                                 moderator_client, rates):
+        rates(content='1/minute')
+        category = Category.objects.create(name='Фильм', slug='films')
+        titles = [
+            Title.objects.create(name=str(idx), year=2000, category=category)
+            for idx in range(2)
+        ]
+        data = {'text': 'Отзыв', 'score': 5}
+        url = '/api/v1/titles/{}/reviews/'
+        response = user_client.post(url.format(titles[0].id), data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url.format(titles[1].id), data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что создание отзывов ограничено для пользователя.'
+        )
+        assert not context.captured_queries, (
+            'Проверьте, что отклонённый запрос не загружает пользователя '
+            'из БД.'
+        )
+        assert user_client.get(
+            url.format(titles[1].id)
+        ).status_code == HTTPStatus.OK, (
+            'Проверьте, что чтение отзывов не ограничивается.'
+        )
+        response = moderator_client.post(url.format(titles[1].id), data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что лимит считается отдельно для каждого '
+            'пользователя.'
+        )
+
+    def test_04_sliding_window(self, tmp_path):
+        counters = SharedWindowCounters(str(tmp_path / 'counters'), 64)
+        assert counters.hit('key', 2, WINDOW, START)[0]
+        assert counters.hit('key', 2, WINDOW, START + 1)[0]
+        allowed, wait = counters.hit('key', 2, WINDOW, START + 2)
+        assert not allowed and wait == WINDOW - 2
+        assert counters.hit('other', 2, WINDOW, START + 2)[0]
+
+        middle = START + WINDOW + WINDOW // 2
+        assert counters.hit('key', 2, WINDOW, middle)[0], (
+            'Проверьте, что запросы предыдущего окна учитываются '
+            'пропорционально прошедшему времени.'
+        )
+        allowed, wait = counters.hit('key', 2, WINDOW, middle)
+        assert not allowed and wait < 1
+        assert counters.hit('key', 2, WINDOW, middle + 1)[0]
+        allowed, wait = counters.hit('key', 2, WINDOW, middle + 1)
+        assert not allowed and wait == WINDOW // 2 - 1
+        assert counters.hit('key', 2, WINDOW, START + 3 * WINDOW)[0]
+
+    def test_05_counters_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / 'counters')
+        process = multiprocessing.get_context('fork').Process(
+            target=hit_in_child, args=(path, 10)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        counters = SharedWindowCounters(path, 64)
+        assert not counters.hit('shared', 10, WINDOW, START)[0], (
+            'Проверьте, что счётчики общие для процессов на сервере.'
+        )
+
+    def test_06_forwarded_for_does_not_bypass_limit(self, client, rates):
+        rates(auth='2/minute')
+        statuses = [
+            client.post(
+                self.URL_SIGNUP, HTTP_X_FORWARDED_FOR=f'10.1.0.{idx}'
+            ).status_code
+            for idx in range(3)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что лимит считается по адресу соединения и '
+            'не обходится сменой заголовка `X-Forwarded-For`.'
+        )
+
+    def test_07_counters_file_is_private(self, tmp_path):
+        path = str(tmp_path / 'counters')
+        SharedWindowCounters(path, 64)
+        assert stat.S_IMODE(os.stat(path).st_mode) & 0o077 == 0, (
+            'Проверьте, что файл счётчиков доступен только владельцу.'
+        )
@@ -0,0 +1,315 @@
+import csv
+import json
+import os
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+
+from reviews.csv_import import read_chunk
+from reviews.management.commands.import_data import (GENRE_TITLE,
+                                                     get_dependencies)
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+def count_rows(name):
+    with open(os.path.join(DATA_DIR, name), newline='',
+              encoding='utf-8') as csv_file:
+        return sum(1 for _ in csv.DictReader(csv_file))
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def import_data(*args):
+    out = StringIO()
+    call_command('import_data', *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25ImportData:
+
+    def test_01_import_in_chunks(self):
+        output = import_data(
+            '--dir', DATA_DIR, '--chunk-size', '7', '--batch-size', '3',
+            '--jobs', '3'
+        )
+        assert 'SUCCESSFULLY LOADED DATA' in output, output
+        for model, name in (
+            (User, 'users.csv'), (Genre, 'genre.csv'),
+            (Title, 'titles.csv'), (Review, 'review.csv'),
+            (Comment, 'comments.csv'),
+        ):
+            assert model.objects.count() == count_rows(name), (
+                f'Проверьте, что из файла {name} загружены все строки '
+                'при загрузке частями.'
+            )
+        assert 'rows/s' in output, (
+            'Проверьте, что команда выводит скорость загрузки.'
+        )
+        assert Title.objects.filter(rating__isnull=False).exists()
+        assert Title.genre.through.objects.count() == count_rows(
+            'genre_title.csv'
+        ), 'Проверьте, что команда загружает жанры произведений.'
+
+    def test_02_chunks_committed_separately(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', ('id', 'name', 'slug'), (
+            (1, 'Фильм', 'movie'),
+        ))
+        # Ссылка на несуществующую категорию проходит проверку полей,
+        # но нарушает внешний ключ при записи.
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), (
+            (1, 'first', 2000, 1), (2, 'second', 2000, 1),
+            (3, 'third', 2000, 1), (4, 'fourth', 2000, 99),
+        ))
+        output = import_data(
+            '--dir', str(tmp_path), '--chunk-size', '2', '--jobs', '1'
+        )
+        assert 'FAILED TO LOAD DATA' in output
+        assert sorted(Title.objects.values_list('name', flat=True)) == [
+            'first', 'second'
+        ], (
+            'Проверьте, что каждая часть файла сохраняется в своей '
+            'транзакции: ошибка в части не отменяет предыдущие.'
+        )
+
+    def test_03_genre_title_skips_unknown_ids(self, tmp_path):
+        write_csv(tmp_path / 'genre.csv', ('id', 'name', 'slug'), (
+            (1, 'Драма', 'drama'), (2, 'Комедия', 'comedy'),
+        ))
+        write_csv(tmp_path / 'category.csv', ('id', 'name', 'slug'), (
+            (1, 'Фильм', 'movie'),
+        ))
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), (
+            (1, 'Первое', 2000, 1), (2, 'Второе', 2001, 1),
+        ))
+        write_csv(tmp_path / 'genre_title.csv', ('id', 'title_id',
+                                                 'genre_id'), (
+            (1, 1, 1), (2, 1, 2), (3, 2, 2), (4, 99, 1), (5, 2, 99),
+            (6, 'x', 1),
+        ))
+        output = import_data(
+            '--dir', str(tmp_path), '--chunk-size', '4', '--jobs', '1',
+            '--rejects', str(tmp_path / 'rejects.ndjson')
+        )
+        assert sorted(
+            Title.genre.through.objects.values_list('title_id', 'genre_id')
+        ) == [(1, 1), (1, 2), (2, 2)], (
+            'Проверьте, что связи с несуществующими произведениями или '
+            'жанрами пропускаются, а остальные загружаются.'
+        )
+        assert 'Skipped 2 rows' in output
+        assert 'Rejected 1 invalid rows' in output, (
+            'Проверьте, что строка с нечисловым id отклоняется проверкой.'
+        )
+        assert list(
+            Title.objects.get(pk=1).genre.values_list('slug', flat=True)
+        ) == ['drama', 'comedy']
+
+    def test_04_dependencies_from_foreign_keys(self):
+        assert get_dependencies(Review) == {User, Title}
+        assert get_dependencies(Comment) == {User, Review}
+        assert get_dependencies(Title) == {Category}
+        assert get_dependencies(GENRE_TITLE) == {Title, Genre}
+        assert get_dependencies(Genre) == set(), (
+            'Проверьте, что независимые файлы не ждут друг друга.'
+        )
+
+    def test_05_read_chunk_resumes_at_offset(self):
+        path = os.path.join(DATA_DIR, 'review.csv')
+        rows, offset = [], 0
+        while offset is not None:
+            chunk, offset = read_chunk(path, offset, 5)
+            rows.extend(chunk)
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            expected = list(csv.DictReader(csv_file))
+        for row in expected:
+            row['author_id'] = row.pop('author')
+        assert rows == expected, (
+            'Проверьте, что чтение частями по позиции в файле не теряет '
+            'и не разрывает многострочные записи.'
+        )
+
+    def test_06_incremental_import_updates_changed_rows(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', ('id', 'name', 'slug'), (
+            (1, 'Фильм', 'movie'), (2, 'Книга', 'book'),
+        ))
+        titles = [[1, 'Первое', 2000, 1], [2, 'Второе', 2001, 1]]
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), titles)
+        args = ('--dir', str(tmp_path), '--jobs', '1', '--incremental')
+        import_data(*args)
+        assert Title.objects.count() == 2
+        Title.objects.filter(pk=1).update(rating=7)
+
+        output = import_data(*args)
+        assert 'Skipped unchanged file' in output, (
+            'Проверьте, что в режиме --incremental файл, не изменившийся '
+            'с прошлой загрузки, пропускается.'
+        )
+
+        titles[0][1] = 'Первое (исправлено)'
+        titles[0][3] = 2
+        titles.append([3, 'Третье', 2002, 2])
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), titles)
+        Title.objects.filter(pk=2).update(name='Изменено в БД')
+        output = import_data(*args)
+        title = Title.objects.get(pk=1)
+        assert (title.name, title.category_id) == (
+            'Первое (исправлено)', 2
+        ), (
+            'Проверьте, что в режиме --incremental изменённые строки '
+            'обновляют существующие записи.'
+        )
+        assert title.rating == 7, (
+            'Проверьте, что обновляются только колонки из csv-файла.'
+        )
+        assert Title.objects.filter(pk=3).exists()
+        assert Title.objects.get(pk=2).name == 'Изменено в БД', (
+            'Проверьте, что строки, не изменившиеся в csv-файле, '
+            'не перезаписываются.'
+        )
+        assert 'Skipped 1 unchanged rows' in output
+
+    def test_07_fast_mode_restores_indexes_and_pragmas(self):
+        def database_state():
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                synchronous = cursor.fetchone()[0]
+                cursor.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'index'"
+                )
+                return synchronous, sorted(cursor.fetchall())
+
+        before = database_state()
+        output = import_data('--dir', DATA_DIR, '--jobs', '1', '--fast')
+        assert 'SUCCESSFULLY LOADED DATA' in output, output
+        assert Review.objects.count() == count_rows('review.csv')
+        assert Title.objects.filter(rating__isnull=False).exists()
+        assert database_state() == before, (
+            'Проверьте, что после загрузки с --fast индексы построены '
+            'заново, а настройки соединения восстановлены.'
+        )
+
+    def test_08_invalid_rows_go_to_rejects_file(self, tmp_path):
+        data_dir = tmp_path / 'data'
+        data_dir.mkdir()
+        write_csv(data_dir / 'users.csv', ('id', 'username', 'email'), (
+            (1, 'reader', 'reader@yamdb.fake'),
+            (2, 'me', 'me@yamdb.fake'),
+            (3, 'bad name', 'bad@yamdb.fake'),
+            (4, 'writer', 'not-an-email'),
+        ))
+        write_csv(data_dir / 'category.csv', ('id', 'name', 'slug'), (
+            (1, 'Фильм', 'movie'),
+        ))
+        write_csv(data_dir / 'titles.csv', ('id', 'name', 'year',
+                                             'category'), (
+            (1, 'Первое', 2000, 1), (2, 'Древнее', -5000, 1),
+        ))
+        write_csv(data_dir / 'review.csv', ('id', 'title_id', 'text',
+                                             'author', 'score',
+                                             'pub_date'), (
+            (1, 1, 'Хорошо', 1, 8, '2019-09-24T21:08:21.567Z'),
+            (2, 1, 'Слишком хорошо', 1, 11, '2019-09-24T21:08:21.567Z'),
+        ))
+        rejects = tmp_path / 'rejects.ndjson'
+        output = import_data(
+            '--dir', str(data_dir), '--jobs', '2', '--rejects', str(rejects)
+        )
+        assert list(User.objects.values_list('username', flat=True)) == [
+            'reader'
+        ], 'Проверьте, что строки с ошибками проверки не загружаются.'
+        assert list(Title.objects.values_list('pk', flat=True)) == [1]
+        assert list(Review.objects.values_list('score', flat=True)) == [8]
+        assert 'Rejected 3 invalid rows' in output, output
+
+        with open(rejects, encoding='utf-8') as rejects_file:
+            records = [json.loads(line) for line in rejects_file]
+        assert {
+            (record['file'], record['row'], record['id'])
+            for record in records
+        } == {
+            ('users.csv', 2, '2'), ('users.csv', 3, '3'),
+            ('users.csv', 4, '4'), ('titles.csv', 2, '2'),
+            ('review.csv', 2, '2'),
+        }, (
+            'Проверьте, что каждая отклонённая строка записана в файл '
+            'с именем файла, номером строки и id.'
+        )
+        errors = {
+            (record['file'], record['id']): record['errors']
+            for record in records
+        }
+        assert set(errors['users.csv', '2']) == {'username'}
+        assert set(errors['users.csv', '4']) == {'email'}
+        assert set(errors['titles.csv', '2']) == {'year'}
+        assert set(errors['review.csv', '2']) == {'score'}, (
+            'Проверьте, что ошибки в файле отклонённых строк '
+            'сгруппированы по полям.'
+        )
+
+    def test_09_import_changes_api_versions(self, client, tmp_path):
+        import_data('--dir', DATA_DIR, '--jobs', '1')
+        review = Review.objects.filter(title_id=1).order_by('pk').first()
+        urls = (
+            '/api/v1/titles/',
+            '/api/v1/titles/1/reviews/',
+            f'/api/v1/titles/1/reviews/{review.pk}/comments/',
+        )
+        etags = {url: client.get(url)['ETag'] for url in urls}
+
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), (
+            (998, 'Новое', 2020, 1),
+        ))
+        write_csv(tmp_path / 'review.csv', ('id', 'title_id', 'text',
+                                            'author', 'score',
+                                            'pub_date'), (
+            (998, 1, 'Новый отзыв', 100, 1, '2020-01-01T00:00:00Z'),
+        ))
+        write_csv(tmp_path / 'comments.csv', ('id', 'review_id', 'text',
+                                              'author', 'pub_date'), (
+            (998, review.pk, 'Новый комментарий', 100,
+             '2020-01-01T00:00:00Z'),
+        ))
+        import_data('--dir', str(tmp_path), '--jobs', '1')
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что после import_data GET-запрос к `{url}` '
+                'с прежним `If-None-Match` возвращает новые данные.'
+            )
+
+    def test_10_new_titles_get_rankings(self, tmp_path):
+        write_csv(tmp_path / 'category.csv', ('id', 'name', 'slug'), (
+            (1, 'Фильм', 'movie'),
+        ))
+        titles = [[1, 'Первое', 2000, 1]]
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), titles)
+        args = ('--dir', str(tmp_path), '--jobs', '1', '--incremental')
+        import_data(*args)
+
+        titles.append([998, 'Новое', 2001, 1])
+        write_csv(tmp_path / 'titles.csv', ('id', 'name', 'year',
+                                            'category'), titles)
+        import_data(*args)
+        assert TitleRanking.objects.filter(title_id=998).count() == 2, (
+            'Проверьте, что для произведений, добавленных загрузкой '
+            'с --incremental, создаются строки таблицы лучших.'
+        )
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from reviews.models import Comment, Genre, Review, Title, User
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+FILES = (
+    'users.csv', 'genre.csv', 'category.csv', 'titles.csv',
+    'genre_title.csv', 'review.csv', 'comments.csv',
+)
+
+
+def read_header(path):
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        return next(csv.reader(csv_file))
+
+
+def call(name, *args):
+    out = StringIO()
+    call_command(name, *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26ExportData:
+
+    def test_01_csv_export_can_be_imported(self, tmp_path):
+        call('import_data', '--dir', DATA_DIR, '--jobs', '1')
+        title = Title.objects.order_by('pk').first()
+        title.description = 'Описание, с запятой и "кавычками"\nв две строки'
+        title.save()
+        # В csv нет NULL: пустое описание загружается пустой строкой
+        descriptions = sorted(
+            (pk, description or '')
+            for pk, description in Title.objects.values_list(
+                'id', 'description'
+            )
+        )
+        scores = sorted(Review.objects.values_list('id', 'score'))
+        genres = sorted(Title.genre.through.objects.values_list(
+            'title_id', 'genre_id'
+        ))
+        output = call(
+            'export_data', '--dir', str(tmp_path), '--chunk-size', '3'
+        )
+        assert 'SUCCESSFULLY EXPORTED DATA' in output, output
+        for name in FILES:
+            source = read_header(os.path.join(DATA_DIR, name))
+            assert read_header(tmp_path / name)[:len(source)] == source, (
+                f'Проверьте, что {name} выгружается с теми же колонками, '
+                'что читает import_data.'
+            )
+        assert not list(tmp_path.glob('*.tmp'))
+
+        for model in (Comment, Review, Title, Genre, User):
+            model.objects.all().delete()
+        output = call(
+            'import_data', '--dir', str(tmp_path), '--jobs', '1',
+            '--rejects', str(tmp_path / 'rejects.ndjson')
+        )
+        assert 'SUCCESSFULLY LOADED DATA' in output, output
+        assert 'Rejected' not in output, output
+        assert sorted(Review.objects.values_list('id', 'score')) == scores
+        assert sorted(
+            (pk, description or '')
+            for pk, description in Title.objects.values_list(
+                'id', 'description'
+            )
+        ) == descriptions, (
+            'Проверьте, что описание произведений выгружается в csv.'
+        )
+        assert sorted(Title.genre.through.objects.values_list(
+            'title_id', 'genre_id'
+        )) == genres, (
+            'Проверьте, что выгрузка в csv загружается обратно '
+            'командой import_data без потерь.'
+        )
+
+    def test_02_ndjson_export(self, tmp_path):
+        call('import_data', '--dir', DATA_DIR, '--jobs', '1')
+        call('export_data', '--dir', str(tmp_path), '--format', 'ndjson')
+        with gzip.open(tmp_path / 'review.ndjson.gz', 'rt',
+                       encoding='utf-8') as ndjson_file:
+            records = [json.loads(line) for line in ndjson_file]
+        assert len(records) == Review.objects.count(), (
+            'Проверьте, что в ndjson выгружаются все строки таблицы.'
+        )
+        assert set(records[0]) == {
+            field.attname for field in Review._meta.concrete_fields
+        }, 'Проверьте, что в ndjson выгружаются все поля модели.'
+        review = Review.objects.get(pk=records[0]['id'])
+        assert (records[0]['author_id'], records[0]['score']) == (
+            review.author_id, review.score
+        )
+
+        title = Title.objects.order_by('pk').first()
+        title.description = 'Описание'
+        title.save()
+        call('export_data', '--dir', str(tmp_path), '--format', 'ndjson')
+        with gzip.open(tmp_path / 'titles.ndjson.gz', 'rt',
+                       encoding='utf-8') as ndjson_file:
+            record = json.loads(ndjson_file.readline())
+        assert (record['description'], record['rating']) == (
+            title.description, title.rating
+        ), 'Проверьте, что в ndjson выгружаются все поля произведения.'